@@ -0,0 +1,511 @@
+"""loraCivitaiHelper 성능 측정 스크립트
+
+가짜 모델 라이브러리(헤더가 올바른 safetensors, info JSON, PNG/MP4 미리보기)를 만들고
+Civitai API 를 흉내 내는 로컬 서버(지연 시간, 429 응답 조절 가능)를 띄운 뒤
+단계별(폴더 찾기, 해시, 조회, 다운로드, 전체 처리, DB 동기화, 검색, 그리드 배치) 시간을 재서
+JSON 으로 출력한다. 커밋마다 결과를 저장해 두고 --compare 로 비교하면 된다.
+
+    python benchmark.py --models 1000 --output before.json
+    python benchmark.py --models 1000 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from io import BytesIO
+from pathlib import Path
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+import loraCivitaiHelper as helper
+
+# 가짜 모델 이름/태그에 쓰는 단어
+WORDS = ["anime", "portrait", "style", "detail", "lighting", "character", "landscape", "cyberpunk",
+         "watercolor", "armor", "fantasy", "photo", "sketch", "neon", "vintage", "pastel"]
+BASE_MODELS = ["SD 1.5", "SDXL 1.0", "Pony", "Flux.1 D"]
+MODEL_TYPES = ["LORA", "LoCon", "Checkpoint"]
+
+# 검색 단계에서 재는 질의 (빈 검색, 접두어, 여러 단어, 필터, 결과 없음)
+SEARCH_QUERIES = ["", "anime", "por", "anime style", "base:SDXL_1.0", "tag:fantasy detail", "zzzz"]
+
+# ---------------------------------------------------------------------------
+# 가짜 라이브러리
+
+# 해시(또는 임의 문자열)에서 항상 같은 모델 버전 정보를 만듦
+def fake_version(key, base_url, video_every):
+    seed = int(hashlib.sha256(key.encode()).hexdigest()[:12], 16)
+    rng = random.Random(seed)
+    version_id = seed % 10 ** 9 + 1
+    ext = "mp4" if video_every and seed % video_every == 0 else "png"
+    words = rng.sample(WORDS, 3)
+    return {
+        "id": version_id,
+        "modelId": seed % 10 ** 6 + 1,
+        "name": f"v{rng.randint(1, 5)}.0",
+        "model": {"name": " ".join(word.capitalize() for word in words), "type": rng.choice(MODEL_TYPES),
+                  "tags": rng.sample(WORDS, rng.randint(1, 3))},
+        "trainedWords": [f"{words[0]}_{rng.randint(0, 99)}"],
+        "baseModel": rng.choice(BASE_MODELS),
+        "createdAt": f"202{rng.randint(3, 5)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00.000Z",
+        "files": [{"hashes": {"SHA256": key.upper()}}],
+        "images": [{"url": f"{base_url}/images/{version_id}.{ext}"}],
+    }
+
+# 헤더(8바이트 길이 + JSON) 뒤에 임의의 텐서 데이터가 붙은 safetensors 파일
+def write_safetensors(path, rng, size):
+    count = max(1, size // 2)
+    header = json.dumps({
+        "__metadata__": {"format": "pt"},
+        "lora_unet.weight": {"dtype": "F16", "shape": [count], "data_offsets": [0, count * 2]},
+    }).encode()
+    header += b" " * (-len(header) % 8)
+    with open(path, "wb") as f:
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        remaining = count * 2
+        while remaining:
+            chunk = min(remaining, 1024 * 1024)
+            f.write(rng.randbytes(chunk))
+            remaining -= chunk
+
+def make_png_preview(width=512, height=768):
+    buffer = BytesIO()
+    Image.effect_noise((width, height), 64).convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
+
+# OpenCV 가 없으면 None (동영상 미리보기 없이 진행)
+def make_mp4_preview(path, width=256, height=384, frames=48):
+    try:
+        helper.load_video_modules()
+    except ImportError:
+        return None
+    cv2, np = helper.cv2, helper.np
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 24, (width, height))
+    for i in range(frames):
+        frame = np.zeros((height, width, 3), np.uint8)
+        frame[:, :] = ((i * 5) % 255, (i * 3) % 255, 128)
+        writer.write(frame)
+    writer.release()
+    data = Path(path).read_bytes()
+    os.remove(path)
+    return data
+
+# 라이브러리 생성 -> 정보가 이미 있는 모델 수
+# 일부는 info JSON 과 미리보기를 미리 넣어 두고(DB 동기화 대상) 나머지는 서버에서 받게 함
+def generate_library(root, args, png_data, mp4_data):
+    rng = random.Random(args.seed)
+    with_info = 0
+    for i in range(args.models):
+        folder = root / f"group_{i // args.models_per_dir:03d}"
+        if i % 4 == 3:
+            folder = folder / "sub"  # 하위 폴더 탐색도 재도록 일부는 한 단계 더 아래에 둠
+        folder.mkdir(parents=True, exist_ok=True)
+        model_path = folder / f"model_{i:05d}.safetensors"
+        write_safetensors(model_path, rng, args.size_kb * 1024)
+        if rng.random() >= args.with_info:
+            continue
+        with_info += 1
+        version = fake_version(f"local-{i}", "http://localhost", args.video_every if mp4_data else 0)
+        with open(model_path.with_suffix(".civitai.info.json"), "w", encoding="utf-8") as f:
+            json.dump(version, f)
+        if version["images"][0]["url"].endswith(".mp4"):
+            model_path.with_suffix(".preview.mp4").write_bytes(mp4_data)
+        else:
+            model_path.with_suffix(".preview.png").write_bytes(png_data)
+    return with_info
+
+# ---------------------------------------------------------------------------
+# 가짜 Civitai 서버
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(200, json.dumps(data).encode())
+
+    # 요청 수 집계, 지연, 429 응답 (True 면 이미 응답함)
+    def _throttled(self, kind):
+        server = self.server
+        with server.lock:
+            server.counts[kind] = server.counts.get(kind, 0) + 1
+            server.total += 1
+            throttle = server.throttle_every and server.total % server.throttle_every == 0
+            if throttle:
+                server.counts["429"] = server.counts.get("429", 0) + 1
+        if server.latency:
+            time.sleep(server.latency)
+        if throttle:
+            self._send(429, b'{"error": "Too Many Requests"}', headers={"Retry-After": str(server.retry_after)})
+        return throttle
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/api/v1/model-versions/by-hash":
+            self._send(404)
+            return
+        if self._throttled("by_hash_batch"):
+            return
+        self._send_json([version for version in map(self.server.lookup, json.loads(body)) if version])
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:3] == ["api", "v1", "model-versions"] and len(parts) in (4, 5):
+            kind = "by_hash" if len(parts) == 5 else "version"
+            if self._throttled(kind):
+                return
+            if kind == "by_hash":
+                version = self.server.lookup(parts[4])
+            else:
+                version = self.server.versions.get(int(parts[3]) if parts[3].isdigit() else None)
+            if version is None:
+                self._send(404, b'{"error": "Model not found"}')
+            else:
+                self._send_json(version)
+        elif parts[0] == "images" and len(parts) == 2:
+            if self._throttled("image"):
+                return
+            if parts[1].endswith(".mp4"):
+                self._send(200, self.server.mp4_data, "video/mp4")
+            else:
+                self._send(200, self.server.png_data, "image/png")
+        else:
+            self._send(404)
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, args, png_data, mp4_data):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = args.latency_ms / 1000
+        self.throttle_every = args.throttle_every
+        self.retry_after = args.retry_after
+        self.missing_percent = args.missing_percent
+        self.partial = args.partial
+        self.video_every = args.video_every if mp4_data else 0
+        self.png_data = png_data
+        self.mp4_data = mp4_data or b""
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.total = 0
+        self.versions = {}
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    # 해시 -> 모델 버전 (일부는 Civitai 에 없는 모델로 취급)
+    def lookup(self, sha256):
+        sha256 = sha256.lower()
+        if int(hashlib.sha256(sha256.encode()).hexdigest()[:8], 16) % 100 < self.missing_percent:
+            return None
+        version = fake_version(sha256, self.base_url, self.video_every)
+        with self.lock:
+            self.versions[version["id"]] = version
+        if self.partial:
+            # by-hash 응답에 images 가 빠져 있으면 model-versions/{id} 상세 조회를 탐
+            version = {key: value for key, value in version.items() if key != "images"}
+        return version
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+# ---------------------------------------------------------------------------
+# 단계별 측정
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        metrics = func(*args, **kwargs) or {}
+        elapsed = time.perf_counter() - start
+        # "_" 로 시작하는 값은 다음 단계에 넘길 데이터라서 결과에 넣지 않음
+        recorded = {key: value for key, value in metrics.items() if not key.startswith("_")}
+        self.stages[name] = {"seconds": round(elapsed, 4), **recorded}
+        print(f"[{name}] {elapsed:.3f}초 {json.dumps(recorded, ensure_ascii=False)}", file=sys.stderr)
+        return metrics
+
+def stage_discover(root):
+    files = helper.discover_model_files(root)
+    return {"files": len(files)}
+
+def stage_hash(files, jobs):
+    total_bytes = sum(file.stat().st_size for file in files)
+    start = time.perf_counter()
+    hashes = dict(helper.hash_files(files, workers=jobs))
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    return {"files": len(hashes), "mb": round(total_bytes / 2 ** 20, 1),
+            "mb_per_sec": round(total_bytes / 2 ** 20 / elapsed, 1), "_hashes": hashes}
+
+def stage_fetch(sha256_list):
+    batch_size = helper.get_setting("api_batch_size")
+    versions = {}
+    failures = {}
+    for i in range(0, len(sha256_list), batch_size):
+        found, failed = helper.fetch_model_info_by_hashes(sha256_list[i:i + batch_size])
+        versions.update(found)
+        failures.update(failed)
+    not_found = sum(status == "not_found" for status in failures.values())
+    return {"hashes": len(sha256_list), "found": len(versions), "not_found": not_found,
+            "failed": len(failures) - not_found, "_versions": versions}
+
+def stage_download(versions, target):
+    target.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for version in versions.values():
+        url, _ = helper.get_preview_url(version)
+        if url:
+            jobs.append((url, target / url.rsplit("/", 1)[1]))
+    with ThreadPoolExecutor(max_workers=helper.get_setting("api_concurrency")) as executor:
+        ok = sum(executor.map(lambda job: bool(helper.download_file(*job)), jobs))
+    total_bytes = sum(path.stat().st_size for _, path in jobs if path.exists())
+    return {"files": ok, "failed": len(jobs) - ok, "mb": round(total_bytes / 2 ** 20, 2)}
+
+def stage_pipeline(root, jobs):
+    stats = {"pending": 0, "found": 0, "not_found": 0, "failed": 0, "downloaded": 0}
+    lock = threading.Lock()
+
+    def progress(stage, **info):
+        with lock:
+            if stage == "start":
+                stats["pending"] = info["total"]
+            elif stage == "saved":
+                if info["found"]:
+                    stats["found"] += 1
+                else:
+                    stats["not_found" if info["status"] == "not_found" else "failed"] += 1
+                stats["downloaded"] += bool(info["size"])
+
+    helper.process_safetensors_files(root, workers=jobs, progress=progress)
+    return stats
+
+def stage_db_sync(root):
+    return helper.scan_and_update_db(root)
+
+# SQL 검색(search_models)과 메모리 색인(ModelSearchIndex)의 질의당 시간 (중앙값, ms)
+def stage_search(repeat):
+    index = helper.ModelSearchIndex()
+    start = time.perf_counter()
+    index.search("")
+    load_ms = (time.perf_counter() - start) * 1000
+    results = {"index_load_ms": round(load_ms, 2), "queries": {}}
+    for query in SEARCH_QUERIES:
+        keyword, filters = helper.parse_search_query(query)
+        sql_times = []
+        index_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = helper.search_models(keyword, **filters)
+            sql_times.append(time.perf_counter() - start)
+            # 같은 질의의 캐시 결과가 아니라 실제 검색 시간을 재도록 캐시를 비움
+            index.cache.clear()
+            index.last = None
+            start = time.perf_counter()
+            index.search(keyword, **filters)
+            index_times.append(time.perf_counter() - start)
+        results["queries"][query or "(all)"] = {
+            "results": len(rows),
+            "sql_ms": round(sorted(sql_times)[len(sql_times) // 2] * 1000, 3),
+            "index_ms": round(sorted(index_times)[len(index_times) // 2] * 1000, 3),
+        }
+    # 한 글자씩 입력할 때 (직전 결과 안에서 다시 거르는 경로)
+    index.cache.clear()
+    index.last = None
+    start = time.perf_counter()
+    typed = "anime style"
+    for end in range(1, len(typed) + 1):
+        index.search(typed[:end])
+    results["typing_ms_per_key"] = round((time.perf_counter() - start) * 1000 / len(typed), 3)
+    return results
+
+# GUI 없이 _update_grid 의 배치 계산만 재현: 창 너비별로 처음부터 끝까지 스크롤
+def stage_grid_layout(count):
+    prefetch_rows = helper.get_setting("grid_prefetch_rows")
+    viewport_height = 900
+    updates = 0
+    for width in (800, 1280, 1920, 3840):
+        items_per_row, total_rows, cell = helper.compute_grid_layout(count, width)
+        content_height = total_rows * cell
+        scroll_top = 0
+        while scroll_top <= max(0, content_height - viewport_height):
+            helper.visible_index_range(scroll_top, viewport_height, items_per_row, cell, count, prefetch_rows)
+            scroll_top += cell // 4
+            updates += 1
+    return {"results": count, "updates": updates}
+
+# ---------------------------------------------------------------------------
+
+# 프로그램 안에서 잰 시간 (API 대기/요청, DB 쓰기 등 단계 안쪽의 세부 항목)
+def metrics_summary():
+    timings, _ = helper.metrics.snapshot()
+    return {
+        name: {"count": count, "total_ms": round(total * 1000, 2), "max_ms": round(maximum * 1000, 2)}
+        for name, (count, total, maximum, _) in sorted(timings.items())
+    }
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=helper.APP_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=helper.APP_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args, workdir):
+    root = workdir / "library"
+    helper.set_db_file(str(workdir / "bench.db"))
+    helper.THUMBNAIL_CACHE_DIR = str(workdir / "thumb_cache")
+
+    png_data = make_png_preview()
+    mp4_data = make_mp4_preview(workdir / "preview.mp4") if args.video_every else None
+    if args.video_every and mp4_data is None:
+        print("OpenCV 가 없어서 동영상 미리보기 없이 진행합니다.", file=sys.stderr)
+
+    server = StubServer(args, png_data, mp4_data).start()
+    helper.override_settings({
+        "api_base_url": server.base_url + "/api/v1",
+        "api_rate_per_sec": args.api_rate,
+        "watch_interval_sec": 0,
+        "metrics_log_file": str(workdir / "metrics.jsonl"),
+        **({"api_concurrency": args.concurrency} if args.concurrency else {}),
+    })
+
+    timer = Timer()
+    try:
+        start = time.perf_counter()
+        with_info = generate_library(root, args, png_data, mp4_data)
+        generated = {"seconds": round(time.perf_counter() - start, 3), "with_info": with_info}
+
+        timer.run("discover_cold", stage_discover, root)
+        timer.run("discover_warm", stage_discover, root)
+        files = helper.discover_model_files(root)
+        hashes = timer.run("hash_cold", stage_hash, files, args.jobs)["_hashes"]
+        timer.run("hash_cached", stage_hash, files, args.jobs)
+
+        pending = sorted({hashes[file]["sha256"] for file in files
+                          if not file.with_suffix(".civitai.info.json").exists()})
+        versions = timer.run("fetch", stage_fetch, pending)["_versions"]
+        timer.run("download", stage_download, versions, workdir / "downloads")
+
+        timer.run("db_sync_initial", stage_db_sync, root)
+        timer.run("pipeline", stage_pipeline, root, args.jobs)
+        timer.run("db_sync_after_fetch", stage_db_sync, root)
+        timer.run("db_sync_noop", stage_db_sync, root)
+        timer.run("search", stage_search, args.search_repeat)
+        timer.run("grid_layout", stage_grid_layout, len(helper.search_models("")))
+    finally:
+        server.shutdown()
+        server.server_close()
+        helper.close_db()
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "compare", "workdir", "keep", "verbose")},
+        "settings": {name: helper.get_setting(name) for name in (
+            "hash_workers", "hash_buffer_mb", "api_concurrency", "api_rate_per_sec", "api_batch_size",
+            "discovery_workers")},
+        "generate": generated,
+        "stub_requests": dict(sorted(server.counts.items())),
+        "stages": timer.stages,
+        "metrics": metrics_summary(),
+    }
+
+# 이전 결과와 단계별 시간 비교 (1보다 크면 느려짐)
+def print_comparison(result, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n{'stage':<22}{'before':>10}{'after':>10}{'ratio':>8}   ({baseline.get('revision')} -> "
+          f"{result.get('revision')})", file=sys.stderr)
+    for name, stage in result["stages"].items():
+        before = baseline.get("stages", {}).get(name, {}).get("seconds")
+        after = stage["seconds"]
+        ratio = f"{after / before:.2f}" if before else "-"
+        before = f"{before:.3f}" if before is not None else "-"
+        print(f"{name:<22}{before:>10}{after:>10.3f}{ratio:>8}", file=sys.stderr)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="loraCivitaiHelper 성능 측정 (가짜 라이브러리 + 로컬 Civitai 서버)")
+    parser.add_argument("--models", type=int, default=500, help="모델 파일 수")
+    parser.add_argument("--size-kb", type=int, default=512, help="모델 파일 하나의 크기(KB)")
+    parser.add_argument("--models-per-dir", type=int, default=100, help="폴더 하나에 넣을 모델 수")
+    parser.add_argument("--with-info", type=float, default=0.5, help="info JSON/미리보기를 미리 넣어 둘 비율")
+    parser.add_argument("--video-every", type=int, default=10, help="N개 중 하나는 동영상 미리보기 (0 이면 없음)")
+    parser.add_argument("--seed", type=int, default=1234, help="라이브러리 생성 시드")
+    parser.add_argument("--latency-ms", type=float, default=20, help="가짜 서버 응답 지연(ms)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="N번째 요청마다 429 응답 (0 이면 없음)")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="429 응답의 Retry-After(초)")
+    parser.add_argument("--missing-percent", type=int, default=10, help="Civitai 에 없는 모델 비율(%%)")
+    parser.add_argument("--partial", action="store_true", help="by-hash 응답에서 images 를 빼서 상세 조회를 하게 함")
+    parser.add_argument("--api-rate", type=float, default=0, help="초당 최대 요청 수 (기본 0: 제한 없음)")
+    parser.add_argument("--concurrency", type=int, help="동시 요청 수 (기본: api_concurrency 설정)")
+    parser.add_argument("--jobs", type=int, help="해시 계산 스레드 수 (기본: hash_workers 설정)")
+    parser.add_argument("--search-repeat", type=int, default=20, help="검색 질의당 반복 횟수")
+    parser.add_argument("--workdir", help="라이브러리/DB 를 만들 폴더 (기본: 임시 폴더)")
+    parser.add_argument("--keep", action="store_true", help="끝난 뒤 작업 폴더를 지우지 않음")
+    parser.add_argument("--output", help="결과 JSON 을 저장할 파일 (기본: stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--verbose", action="store_true", help="프로그램 로그를 stderr 로 출력")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.workdir:
+        workdir = Path(args.workdir).resolve()
+        if workdir.exists() and any(workdir.iterdir()):
+            print(f"작업 폴더가 비어 있지 않습니다: {workdir}", file=sys.stderr)
+            return 2
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        workdir = Path(tempfile.mkdtemp(prefix="civitai_bench_"))
+
+    try:
+        # 프로그램 로그는 결과 JSON 과 섞이지 않도록 버리거나 stderr 로 보냄
+        with open(os.devnull, "w", encoding="utf-8") as devnull:
+            with redirect_stdout(sys.stderr if args.verbose else devnull):
+                result = run_benchmark(args, workdir)
+    finally:
+        if args.keep:
+            print(f"작업 폴더: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        print_comparison(result, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
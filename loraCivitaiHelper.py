@@ -1,26 +1,108 @@
 import os
+import sys
 import json
 import sqlite3
-import customtkinter as ctk
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import fnmatch
 import hashlib
-import cv2
-import numpy as np
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageDraw, ImageOps, PngImagePlugin, features
 import requests
-import cv2
-from PIL import Image, ImageTk
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import ctypes
 import webbrowser  # 웹브라우저 제어를 위한 모듈 추가
 import threading
 import time
-from queue import Queue
-import tkinter as tk
-from tkinter import filedialog
+import random
+import re
+from collections import OrderedDict
+from contextlib import contextmanager, redirect_stdout
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit
+from queue import Queue, PriorityQueue, Empty
+import itertools
+import unicodedata
+import logging
+from logging.handlers import RotatingFileHandler
 import json
 import os
 
-DB_FILE = "model_info.db"
+# GUI/동영상 모듈은 처음 필요할 때 불러옴
+# (명령줄 모드는 이 모듈들 없이 실행되고, GUI 도 창을 먼저 띄운 뒤 동영상 모듈을 불러옴)
+ctk = None
+tk = None
+filedialog = None
+cv2 = None
+np = None
+
+def load_gui_modules():
+    global ctk, tk, filedialog
+    if ctk is None:
+        import tkinter
+        from tkinter import filedialog as tk_filedialog
+        import customtkinter
+        tk, filedialog, ctk = tkinter, tk_filedialog, customtkinter
+
+def load_video_modules():
+    global cv2, np
+    if cv2 is None:
+        import numpy
+        import cv2 as opencv
+        np, cv2 = numpy, opencv
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# 실행 위치와 상관없이 config.json 옆에 DB 를 둠
+DEFAULT_DB_FILE = os.path.join(APP_DIR, "model_info.db")
+DB_FILE = DEFAULT_DB_FILE
+CONFIG_FILE = os.path.join(APP_DIR, 'config.json')
+THUMBNAIL_CACHE_DIR = os.path.join(APP_DIR, "thumb_cache")
+PREVIEW_TILE_SIZE = 180
+GRID_PADDING = 5
+# WebP 를 지원하지 않는 Pillow 빌드에서는 PNG 로 저장
+if features.check("webp"):
+    THUMBNAIL_FORMAT, THUMBNAIL_EXT, THUMBNAIL_SAVE_OPTIONS = "WEBP", ".webp", {"quality": 85, "method": 4}
+else:
+    THUMBNAIL_FORMAT, THUMBNAIL_EXT, THUMBNAIL_SAVE_OPTIONS = "PNG", ".png", {"optimize": True}
+
+# config.json 에서 덮어쓸 수 있는 기본 설정값
+DEFAULT_SETTINGS = {
+    "hash_workers": 4,  # 해시 계산 스레드 수
+    "hash_buffer_mb": 8,  # 해시 계산 시 한 번에 읽는 크기(MB)
+    "api_base_url": "https://civitai.com/api/v1",  # 로컬 테스트 서버로 바꿀 수 있음
+    "api_concurrency": 4,  # 동시에 처리할 API 요청/다운로드 수
+    "api_rate_per_sec": 2.0,  # 초당 최대 요청 수 (0 이면 제한 없음)
+    "api_max_retries": 5,  # 429/5xx 응답 재시도 횟수
+    "api_timeout": 30,  # 요청 타임아웃(초)
+    "api_batch_size": 100,  # 해시 일괄 조회 한 번에 보낼 개수
+    "download_chunk_kb": 1024,  # 다운로드 시 한 번에 쓰는 크기(KB)
+    "download_timeout": 60,  # 다운로드 읽기 타임아웃(초)
+    "download_max_resumes": 3,  # 끊긴 다운로드를 이어받는 횟수
+    "lookup_retry_hours": 24,  # Civitai 에 없는 모델을 다시 조회하기까지의 시간 (실패할 때마다 2배)
+    "lookup_error_retry_minutes": 10,  # HTTP 오류 후 다시 조회하기까지의 시간 (실패할 때마다 2배)
+    "lookup_retry_max_hours": 24 * 30,  # 재시도 간격 최대값
+    "db_cache_mb": 32,  # SQLite 페이지 캐시 크기(MB, 연결마다)
+    "thumbnail_workers": 0,  # 썸네일 미리 만들기 프로세스 수 (0 이면 CPU 수)
+    "grid_prefetch_rows": 2,  # 화면 위아래로 미리 만들어 둘 그리드 행 수
+    "preview_loader_workers": 4,  # 미리보기 타일 로딩 스레드 수
+    "video_preview_max_frames": 120,  # 마우스를 올렸을 때 재생할 최대 프레임 수
+    "video_frames_cache_mb": 512,  # 디스크에 둘 동영상 프레임 캐시 최대 크기(MB), 넘으면 오래된 것부터 지움
+    "image_cache_mb": 256,  # 바로 표시할 수 있는 타일 이미지/동영상 프레임을 메모리에 둘 크기(MB)
+    "search_debounce_ms": 150,  # 입력을 멈춘 뒤 검색할 때까지 기다리는 시간
+    "search_cache_entries": 64,  # 메모리에 둘 최근 검색 결과 수
+    "watch_interval_sec": 5,  # 모델 폴더 변경 확인 주기 (0 이면 감시하지 않음)
+    "model_extensions": [".safetensors", ".ckpt", ".pt"],  # 모델 파일로 취급할 확장자
+    "exclude_patterns": [".*", "@eaDir", "#recycle", "$RECYCLE.BIN"],  # 건너뛸 파일/폴더 (이름 또는 전체 경로 패턴)
+    "discovery_workers": 8,  # 폴더를 동시에 읽는 스레드 수 (NAS 는 지연이 커서 병렬이 유리)
+    "metrics_log_file": "",  # 성능 기록(JSON lines) 파일 (비우면 프로그램 폴더의 metrics.jsonl)
+    "metrics_log_mb": 5,  # 성능 기록 파일 최대 크기(MB), 넘으면 새 파일로 교체 (0 이면 기록 안 함)
+    "metrics_log_backups": 3,  # 보관할 이전 성능 기록 파일 수
+    "metrics_prometheus_file": "",  # Prometheus 텍스트 형식으로 내보낼 파일 (node_exporter textfile 용, 비우면 안 씀)
+    "debug_overlay": False,  # 시작할 때 디버그 창(성능 수치) 표시 (F12 로 켜고 끔)
+    "preview_max_dimension": 512,  # 미리보기 최대 가로/세로(px), 줄인 크기로 받고 큰 파일은 줄여서 저장 (0 이면 원본)
+    "preview_quality": 88,  # 미리보기를 줄여서 다시 저장할 때의 JPEG/WebP 품질 (PNG 는 무손실)
+}
 
 # 전역 변수 추가
 current_video_thread = None
@@ -29,88 +111,1212 @@ video_queue = Queue()
 current_video_image = None  # 현재 재생 중인 이미지 객체 참조 저장
 current_video_button = None  # 현재 재생 중인 버튼 참조 저장
 
+# 성능 기록: 단계별 시간(span)과 카운터
+# - span 은 끝날 때 JSON 한 줄로 성능 기록 파일에 남김 (크기가 넘으면 새 파일로 교체)
+# - 이름별 횟수/합계/최대/마지막 시간과 카운터는 메모리에 모아서
+#   Prometheus 텍스트 파일과 GUI 디버그 창에 보여 줌
+class Metrics:
+    PROMETHEUS_PREFIX = "civitai_helper"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}  # 이름 -> [횟수, 합계, 최대, 마지막] (초)
+        self.counters = {}  # (이름, ((라벨, 값), ...)) -> 값
+        self.logger = None
+
+    def _get_logger(self):
+        # 설정은 처음 기록할 때 읽음
+        with self.lock:
+            if self.logger is None:
+                logger = logging.Logger("civitai_helper.metrics")
+                max_mb = get_setting("metrics_log_mb")
+                if max_mb > 0:
+                    path = get_setting("metrics_log_file") or os.path.join(APP_DIR, "metrics.jsonl")
+                    try:
+                        handler = RotatingFileHandler(path, maxBytes=int(max_mb * 1024 * 1024),
+                                                      backupCount=get_setting("metrics_log_backups"),
+                                                      encoding="utf-8", delay=True)
+                        handler.setFormatter(logging.Formatter("%(message)s"))
+                        logger.addHandler(handler)
+                    except OSError as e:
+                        print(f"성능 기록 파일을 열 수 없습니다: {path} ({e})")
+                self.logger = logger
+            return self.logger
+
+    def close_log(self):
+        """기록 파일을 닫음 (다음 기록 때 설정을 다시 읽음)"""
+        with self.lock:
+            if self.logger is not None:
+                for handler in self.logger.handlers:
+                    handler.close()
+                self.logger = None
+
+    def observe(self, name, seconds, log=True, **fields):
+        """걸린 시간 기록. 자주 불리는 항목은 log=False 로 집계만 함."""
+        with self.lock:
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+            timing[3] = seconds
+        if not log:
+            return
+        logger = self._get_logger()
+        if not logger.handlers:
+            return
+        record = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3), **fields}
+        if fields.get("bytes") and seconds > 0:
+            record["mb_per_sec"] = round(fields["bytes"] / (1024 * 1024) / seconds, 1)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def span(self, name, log=True, **fields):
+        """with metrics.span("download", file=...) as span: 안에서 span["bytes"] 처럼 결과를 덧붙일 수 있음"""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, log, **fields)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted((label, str(v)) for label, v in labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {name: list(timing) for name, timing in self.timings.items()}, dict(self.counters)
+
+    # 디버그 창에 보여 줄 요약 (시간은 ms, *_bytes 카운터는 MB)
+    def summary_lines(self):
+        timings, counters = self.snapshot()
+        lines = []
+        for name, (count, total, maximum, last) in sorted(timings.items()):
+            lines.append(f"{name:<18}{count:>7}회 평균 {total / count * 1000:8.1f} 최대 {maximum * 1000:8.1f} "
+                         f"마지막 {last * 1000:8.1f} ms")
+        for (name, labels), value in sorted(counters.items()):
+            label = " ".join(label_value for _, label_value in labels)
+            if name.endswith("_bytes"):
+                lines.append(f"{name:<18}{value / (1024 * 1024):>10.1f} MB {label}")
+            else:
+                lines.append(f"{name:<18}{value:>10} {label}")
+        return lines
+
+    def prometheus_text(self):
+        timings, counters = self.snapshot()
+        prefix = self.PROMETHEUS_PREFIX
+
+        def label_text(labels):
+            if not labels:
+                return ""
+            escaped = []
+            for label, value in labels:
+                value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                escaped.append(f'{label}="{value}"')
+            return "{" + ",".join(escaped) + "}"
+
+        lines = [f"# TYPE {prefix}_span_seconds summary"]
+        for name, (count, total, _, _) in sorted(timings.items()):
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f"# TYPE {prefix}_span_seconds_max gauge")
+        for name, (_, _, maximum, _) in sorted(timings.items()):
+            lines.append(f'{prefix}_span_seconds_max{{span="{name}"}} {maximum:.6f}')
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{prefix}_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Prometheus 텍스트 파일 갱신 (수집기가 반쯤 쓴 파일을 읽지 않도록 임시 파일 후 교체)"""
+        path = path or get_setting("metrics_prometheus_file")
+        if not path:
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Prometheus 파일 저장 실패: {path} ({e})")
+
+metrics = Metrics()
+
+# DB 접근 계층
+# - 쓰기: 프로세스 전체에서 연결 하나를 잠금으로 공유 (db_write)
+# - 읽기: 스레드마다 연결 하나 (db_read), WAL 모드라 쓰는 중에도 읽을 수 있음
+#   다운로드 풀처럼 잠깐 쓰고 끝나는 스레드도 있으므로 끝난 스레드의 연결은 다음 연결을 만들 때 닫음
+_write_conn = None
+_write_lock = threading.RLock()
+_read_local = threading.local()
+_read_conns = {}  # {스레드: 연결}
+_db_generation = 0
+_db_initialized = False
+fts_enabled = False
+
+# models/info_files 구조가 바뀌면 올림 (이전 버전 DB 는 자동으로 다시 만들어짐)
+SCHEMA_VERSION = 4
+
+def _connect(check_same_thread=True):
+    # 예전 버전은 실행 위치에 DB 를 만들었으므로 한 번 옮겨 옴 (해시 캐시 보존)
+    legacy_db = os.path.abspath("model_info.db")
+    if (DB_FILE == DEFAULT_DB_FILE and legacy_db != DB_FILE
+            and not os.path.exists(DB_FILE) and os.path.exists(legacy_db)):
+        import shutil
+        shutil.copy2(legacy_db, DB_FILE)
+        print(f"DB 위치 변경: {legacy_db} -> {DB_FILE}")
+
+    conn = sqlite3.connect(DB_FILE, timeout=30, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{get_setting('db_cache_mb') * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA busy_timeout=30000")
+    # REPLACE 로 지워지는 행도 삭제 트리거(FTS 동기화)를 타도록 함
+    conn.execute("PRAGMA recursive_triggers=ON")
+    return conn
+
+@contextmanager
+def db_write():
+    """쓰기 연결을 잠그고 트랜잭션으로 감싸서 넘겨줌 (예외가 나면 롤백)"""
+    global _write_conn
+    with _write_lock:
+        if _write_conn is None:
+            _write_conn = _connect(check_same_thread=False)
+        # 잠금을 얻은 뒤부터 커밋까지의 시간
+        with metrics.span("db_write", log=False), _write_conn:
+            yield _write_conn
+
+def db_read():
+    """현재 스레드의 읽기 전용 연결"""
+    conn = getattr(_read_local, "conn", None)
+    if conn is None or getattr(_read_local, "generation", None) != _db_generation:
+        # 스레드가 끝난 뒤 다른 스레드에서 닫을 수 있도록 check_same_thread 는 끔 (사용은 만든 스레드에서만)
+        conn = _connect(check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        _read_local.conn = conn
+        _read_local.generation = _db_generation
+        with _write_lock:
+            for thread in [thread for thread in _read_conns if not thread.is_alive()]:
+                _read_conns.pop(thread).close()
+            _read_conns[threading.current_thread()] = conn
+    return conn
+
+def close_db():
+    global _write_conn, _db_generation, _db_initialized
+    with _write_lock:
+        if _write_conn is not None:
+            _write_conn.close()
+            _write_conn = None
+        # 다른 스레드의 읽기 연결은 다음 사용 때 새로 만들어지도록 세대만 올림
+        for conn in _read_conns.values():
+            conn.close()
+        _read_conns.clear()
+        _db_generation += 1
+        _db_initialized = False
+
+# query 의 {} 자리에 values 를 IN 목록으로 넣어 실행 (SQLite 변수 개수 제한 때문에 나눠서 실행)
+def _select_in(query, values, chunk_size=500):
+    values = list(values)
+    rows = []
+    for i in range(0, len(values), chunk_size):
+        chunk = values[i:i + chunk_size]
+        rows += db_read().execute(query.format(", ".join("?" * len(chunk))), chunk).fetchall()
+    return rows
+
+def set_db_file(path):
+    """다른 DB 파일 사용 (벤치마크 등)"""
+    global DB_FILE
+    close_db()
+    DB_FILE = os.path.abspath(path)
+
 # DB 초기화 및 테이블 생성
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    global _db_initialized
+    if _db_initialized:
+        return
+    with db_write() as conn:
+        _create_tables(conn)
+    _db_initialized = True
+
+def _create_tables(conn):
+    global fts_enabled
     c = conn.cursor()
+    # models 는 JSON 에서 다시 만들 수 있으므로 구조가 바뀌면 지우고 전체 재동기화
+    if c.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        c.execute("DROP TABLE IF EXISTS models_fts")
+        c.execute("DROP TABLE IF EXISTS model_tags")
+        c.execute("DROP TABLE IF EXISTS models")
+        c.execute("DROP TABLE IF EXISTS info_files")
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    # 모델 파일 하나당 한 행 (같은 모델의 다른 버전도 각각 저장)
     c.execute("""
         CREATE TABLE IF NOT EXISTS models (
-            modelId INTEGER PRIMARY KEY,
+            id INTEGER PRIMARY KEY,
+            versionId INTEGER,
+            modelId INTEGER,
+            sha256 TEXT,
+            path TEXT UNIQUE,
             safetensor TEXT,
             modelname TEXT,
-            trainedWords TEXT
+            versionName TEXT,
+            trainedWords TEXT,
+            tags TEXT,
+            baseModel TEXT,
+            modelType TEXT,
+            fileSize INTEGER,
+            createdAt TEXT,
+            addedAt REAL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_version ON models (versionId, sha256)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_model ON models (modelId)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_base ON models (baseModel COLLATE NOCASE, addedAt)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_type ON models (modelType COLLATE NOCASE, addedAt)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_size ON models (fileSize)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_created ON models (createdAt)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_added ON models (addedAt)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_models_name ON models (modelname COLLATE NOCASE)")
+    # 태그 필터용 (tag 로 바로 찾을 수 있도록 tag 가 앞에 오는 키)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS model_tags (
+            tag TEXT COLLATE NOCASE,
+            model_id INTEGER,
+            PRIMARY KEY (tag, model_id)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_model_tags_model ON model_tags (model_id)")
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS models_tags_delete AFTER DELETE ON models BEGIN
+            DELETE FROM model_tags WHERE model_id = old.id;
+        END
+    """)
+    fts_enabled = _create_fts(c)
+    # 해시 캐시 (파일 식별 정보가 같으면 재계산하지 않음)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            sha256 TEXT,
+            autov2 TEXT,
+            autov3 TEXT
+        )
+    """)
+    # 이전 버전 DB 에는 autov2/autov3 컬럼이 없음
+    columns = {row[1] for row in c.execute("PRAGMA table_info(file_hashes)")}
+    for column in ("autov2", "autov3"):
+        if column not in columns:
+            c.execute(f"ALTER TABLE file_hashes ADD COLUMN {column} TEXT")
+    # 마지막으로 읽은 JSON 파일 상태 (바뀐 파일만 다시 읽기 위함)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS info_files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER,
+            size INTEGER,
+            model_path TEXT
         )
     """)
-    conn.commit()
-    conn.close()
+    c.execute("CREATE INDEX IF NOT EXISTS idx_info_files_model ON info_files (model_path)")
+    # 폴더별 마지막 목록 (폴더 수정 시각이 같으면 다시 읽지 않음)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS dir_cache (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER,
+            filter TEXT,
+            files TEXT,
+            subdirs TEXT
+        )
+    """)
+    # 조회 실패 기록 (재시도 시각 전까지, 파일이 바뀌지 않으면 건너뜀)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS lookup_failures (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha256 TEXT,
+            status TEXT,
+            attempts INTEGER,
+            last_attempt REAL,
+            next_retry REAL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_file_hashes_sha256 ON file_hashes (sha256)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_file_hashes_autov3 ON file_hashes (autov3)")
+
+# 전문 검색 색인 (models 를 content 로 쓰고 트리거로 동기화)
+# FTS5 가 없는 SQLite 이면 False 를 돌려주고 검색은 LIKE 로 대신함
+def _create_fts(c):
+    try:
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS models_fts USING fts5(
+                modelname, safetensor, trainedWords, tags, baseModel,
+                content='models', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 를 사용할 수 없어 일반 검색을 사용합니다: {e}")
+        return False
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS models_fts_insert AFTER INSERT ON models BEGIN
+            INSERT INTO models_fts (rowid, modelname, safetensor, trainedWords, tags, baseModel)
+            VALUES (new.id, new.modelname, new.safetensor, new.trainedWords, new.tags, new.baseModel);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS models_fts_delete AFTER DELETE ON models BEGIN
+            INSERT INTO models_fts (models_fts, rowid, modelname, safetensor, trainedWords, tags, baseModel)
+            VALUES ('delete', old.id, old.modelname, old.safetensor, old.trainedWords, old.tags, old.baseModel);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS models_fts_update AFTER UPDATE ON models BEGIN
+            INSERT INTO models_fts (models_fts, rowid, modelname, safetensor, trainedWords, tags, baseModel)
+            VALUES ('delete', old.id, old.modelname, old.safetensor, old.trainedWords, old.tags, old.baseModel);
+            INSERT INTO models_fts (rowid, modelname, safetensor, trainedWords, tags, baseModel)
+            VALUES (new.id, new.modelname, new.safetensor, new.trainedWords, new.tags, new.baseModel);
+        END
+    """)
+    return True
+
+MODEL_COLUMNS = (
+    "versionId", "modelId", "sha256", "path", "safetensor", "modelname", "versionName", "trainedWords",
+    "tags", "baseModel", "modelType", "fileSize", "createdAt", "addedAt",
+)
+
+def _upsert_models(c, rows):
+    # rows: MODEL_COLUMNS 순서의 dict 목록 (tag_list 포함)
+    c.executemany(f"""
+        REPLACE INTO models ({", ".join(MODEL_COLUMNS)})
+        VALUES ({", ".join("?" * len(MODEL_COLUMNS))})
+    """, [tuple(row[column] for column in MODEL_COLUMNS) for row in rows])
+    c.executemany(
+        "INSERT OR IGNORE INTO model_tags (tag, model_id) SELECT ?, id FROM models WHERE path = ?",
+        [(tag, row["path"]) for row in rows for tag in row["tag_list"]]
+    )
 
 # DB에 메타데이터 저장
-def insert_model_data(modelId, safetensor, modelname, trainedWords):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("REPLACE INTO models (modelId, safetensor, modelname, trainedWords) VALUES (?, ?, ?, ?)",
-              (modelId, safetensor, modelname, ", ".join(trainedWords)))
-    conn.commit()
-    conn.close()
-
-# DB에서 검색
-def search_models(keyword):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    if keyword.strip() == "":
-        query = "SELECT modelId, safetensor, modelname FROM models"
-        c.execute(query)
-    else:
-        query = """
-            SELECT modelId, safetensor, modelname FROM models
-            WHERE safetensor LIKE ? OR modelname LIKE ?
-        """
-        c.execute(query, (f"%{keyword}%", f"%{keyword}%"))
-    results = c.fetchall()
-    conn.close()
-    return results
-
-# SHA256 해시 계산
-def compute_sha256(file_path):
+def insert_model_data(modelId, safetensor, modelname, trainedWords, tags=(), baseModel="", **fields):
+    init_db()
+    row = dict.fromkeys(MODEL_COLUMNS)
+    row.update(fields)
+    row["path"] = row["path"] or safetensor  # 경로를 따로 주지 않으면 safetensor 를 경로로 사용
+    row.update(modelId=modelId, safetensor=Path(safetensor).name, modelname=modelname,
+               trainedWords=", ".join(trainedWords), tags=", ".join(tags),
+               baseModel=baseModel, tag_list=list(tags))
+    with db_write() as conn:
+        _upsert_models(conn.cursor(), [row])
+
+# JSON 의 태그 목록 (문자열 목록 또는 {"name": ...} 목록)
+def _tag_names(data):
+    tags = data.get("tags") or data.get("model", {}).get("tags") or []
+    names = []
+    for tag in tags:
+        name = tag.get("name") if isinstance(tag, dict) else tag
+        if isinstance(name, str) and name:
+            names.append(name)
+    return names
+
+# info JSON 과 모델 파일 정보로 models 행 만들기
+def _model_row_from_info(data, model_path, st, sha256=None):
+    if not sha256:
+        # 해시를 계산한 적이 없으면 JSON 의 대표 파일 해시 사용
+        files = data.get("files", [])
+        primary = next((f for f in files if f.get("primary")), files[0] if files else {})
+        sha256 = (primary.get("hashes", {}).get("SHA256") or "").lower() or None
+    tags = _tag_names(data)
+    return {
+        "versionId": data.get("id"),
+        "modelId": data.get("modelId"),
+        "sha256": sha256,
+        "path": str(model_path),
+        "safetensor": model_path.name,
+        "modelname": data.get("model", {}).get("name", ""),
+        "versionName": data.get("name", ""),
+        "trainedWords": ", ".join(data.get("trainedWords", [])),
+        "tags": ", ".join(tags),
+        "baseModel": data.get("baseModel", ""),
+        "modelType": data.get("model", {}).get("type", ""),
+        "fileSize": st.st_size,
+        "createdAt": data.get("createdAt", ""),
+        "addedAt": st.st_mtime,
+        "tag_list": tags,
+    }
+
+# 검색 필터 목록 (GUI 선택 상자용)
+def get_filter_values():
+    init_db()
+    c = db_read().cursor()
+    return {
+        "baseModel": [row[0] for row in c.execute(
+            "SELECT DISTINCT baseModel FROM models WHERE baseModel != '' ORDER BY baseModel COLLATE NOCASE")],
+        "modelType": [row[0] for row in c.execute(
+            "SELECT DISTINCT modelType FROM models WHERE modelType != '' ORDER BY modelType COLLATE NOCASE")],
+        "tag": [row[0] for row in c.execute("SELECT DISTINCT tag FROM model_tags ORDER BY tag")],
+    }
+
+# 검색어 안의 필터 구문 분리 (예: "glow base:SDXL tag:style type:LORA")
+SEARCH_FILTER_PREFIXES = {"base:": "base_model", "type:": "model_type", "tag:": "tag"}
+
+def parse_search_query(text):
+    terms = []
+    filters = {}
+    for token in text.split():
+        for prefix, name in SEARCH_FILTER_PREFIXES.items():
+            if token.lower().startswith(prefix) and len(token) > len(prefix):
+                filters[name] = token[len(prefix):].replace("_", " ")
+                break
+        else:
+            terms.append(token)
+    return " ".join(terms), filters
+
+# 검색어를 FTS5 질의로 변환 (각 단어를 접두어 검색, 모든 단어가 포함되어야 함)
+def _fts_query(terms):
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+# 정렬 기준 (relevance 는 검색어가 있을 때 bm25, 없으면 이름순)
+SEARCH_SORTS = {
+    "name": "m.modelname COLLATE NOCASE",
+    "newest": "m.addedAt DESC",
+    "created": "m.createdAt DESC",
+    "size": "m.fileSize DESC",
+}
+
+# DB에서 검색 (여러 단어는 AND, 필터는 색인으로 처리)
+# 결과: (id, modelId, 모델 파일 경로, modelname) 목록
+def search_models(keyword, base_model=None, model_type=None, tag=None,
+                  min_size=None, max_size=None, sort="relevance"):
+    init_db()
+    c = db_read().cursor()
+    terms = keyword.split()
+
+    conditions = []
+    params = []
+    if base_model:
+        conditions.append("m.baseModel = ? COLLATE NOCASE")
+        params.append(base_model)
+    if model_type:
+        conditions.append("m.modelType = ? COLLATE NOCASE")
+        params.append(model_type)
+    if tag:
+        conditions.append("m.id IN (SELECT model_id FROM model_tags WHERE tag = ?)")
+        params.append(tag)
+    if min_size is not None:
+        conditions.append("m.fileSize >= ?")
+        params.append(min_size)
+    if max_size is not None:
+        conditions.append("m.fileSize <= ?")
+        params.append(max_size)
+
+    order = SEARCH_SORTS.get(sort, SEARCH_SORTS["name"])
+    select = "SELECT m.id, m.modelId, m.path, m.modelname"
+
+    if terms and fts_enabled:
+        # 가중치: 모델 이름 > 파일 이름, 트리거 단어 > 태그 > 베이스 모델
+        if sort == "relevance":
+            order = "bm25(models_fts, 10.0, 5.0, 5.0, 2.0, 1.0)"
+        where = " AND ".join(["models_fts MATCH ?"] + conditions)
+        c.execute(f"""
+            {select} FROM models_fts JOIN models m ON m.id = models_fts.rowid
+            WHERE {where} ORDER BY {order}
+        """, [_fts_query(terms)] + params)
+        results = c.fetchall()
+        if results:
+            return results
+        order = SEARCH_SORTS.get(sort, SEARCH_SORTS["name"])
+
+    # 검색어가 없거나, FTS5 가 없거나, 단어 중간에 있는 글자로 검색한 경우
+    columns = ("modelname", "safetensor", "trainedWords", "tags", "baseModel")
+    condition = "(" + " OR ".join(f"m.{column} LIKE ?" for column in columns) + ")"
+    conditions += [condition] * len(terms)
+    params += [f"%{term}%" for term in terms for _ in columns]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    c.execute(f"{select} FROM models m {where} ORDER BY {order}", params)
+    return c.fetchall()
+
+# FTS5 unicode61 토크나이저처럼 문자/숫자 외의 글자로 단어를 나눔
+SEARCH_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# 검색용 문자열: 소문자 + 발음 구별 기호 제거 (FTS5 의 remove_diacritics 2 와 같게 "Café" -> "cafe")
+# 한글 음절이 자모로 나뉜 채 남지 않도록 마지막에 다시 합침
+def fold_search_text(text):
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return unicodedata.normalize("NFC", "".join(c for c in decomposed if not unicodedata.combining(c)))
+
+class ModelSearchIndex:
+    """입력할 때마다 검색할 수 있도록 모델 목록을 메모리에 올려 두고 검색.
+
+    결과 형식, 필터, 검색 방식은 search_models 와 같다 (단어마다 접두어 검색, 결과가
+    없으면 부분 문자열 검색). 관련도는 bm25 대신 같은 필드 가중치의 합으로 정한다.
+    최근 결과는 LRU 로 보관하고, 직전 검색어 뒤에 글자를 이어 입력한 경우에는
+    직전 결과 안에서만 다시 거른다.
+    DB 가 바뀌면 바뀐 모델만 update 로 다시 읽고, 전체를 다시 읽을 때는 reload 를
+    GUI 스레드가 아닌 곳에서 호출한다 (큰 라이브러리는 전체 읽기에 1초 가까이 걸림).
+    """
+
+    # 관련도 가중치: 모델 이름 > 파일 이름, 트리거 단어 > 태그 > 베이스 모델
+    FIELD_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0)
+
+    def __init__(self, cache_size=None):
+        self.cache_size = cache_size or get_setting("search_cache_entries")
+        self.entries = None
+        self.cache = OrderedDict()
+        self.last = None  # (검색어, 필터, 정렬, 결과 항목)
+        self.lock = threading.Lock()
+        self.reload_dirty = None  # reload 중에 update 된 모델 경로 (다 읽은 뒤 다시 반영)
+
+    def update(self, model_paths):
+        """바뀐 모델만 DB 에서 다시 읽어 반영 (지워진 모델은 뺌)."""
+        model_paths = {str(path) for path in model_paths}
+        with self.lock:
+            if self.reload_dirty is not None:
+                self.reload_dirty |= model_paths
+            if not model_paths:
+                return
+            if self.entries is not None:
+                self._update_entries(model_paths)
+            self.cache.clear()
+            self.last = None
+
+    def reload(self):
+        """전체를 다시 읽음. 읽는 동안에도 검색할 수 있도록 다 읽은 뒤에 바꿔 끼움."""
+        with self.lock:
+            self.reload_dirty = set()
+        entries = self._load()
+        with self.lock:
+            dirty, self.reload_dirty = self.reload_dirty, None
+            self.entries = entries
+            if dirty:
+                self._update_entries(dirty)
+            self.cache.clear()
+            self.last = None
+
+    MODEL_QUERY = """
+        SELECT id, modelId, path, modelname, trainedWords, tags, baseModel,
+               modelType, fileSize, addedAt, createdAt, safetensor
+        FROM models
+    """
+
+    def _load(self):
+        init_db()
+        c = db_read().cursor()
+        tags = {}
+        for model_id, tag in c.execute("SELECT model_id, tag FROM model_tags"):
+            tags.setdefault(model_id, set()).add(tag.lower())  # model_tags.tag 는 COLLATE NOCASE
+        return [self._entry(row, tags) for row in c.execute(self.MODEL_QUERY + " ORDER BY modelname COLLATE NOCASE")]
+
+    def _update_entries(self, model_paths):
+        init_db()
+        rows = _select_in(self.MODEL_QUERY + " WHERE path IN ({})", model_paths)
+        tags = {}
+        for model_id, tag in _select_in("SELECT model_id, tag FROM model_tags WHERE model_id IN ({})",
+                                        [row[0] for row in rows]):
+            tags.setdefault(model_id, set()).add(tag.lower())
+        entries = [entry for entry in self.entries if entry["row"][2] not in model_paths]
+        entries += [self._entry(row, tags) for row in rows]
+        # 나머지는 이미 이름순이므로 거의 정렬된 목록을 정렬하는 셈 (한 번 훑는 정도의 비용)
+        entries.sort(key=lambda entry: (entry["row"][3] or "").lower())
+        self.entries = entries
+
+    @staticmethod
+    def _entry(row, tags):
+        fields = tuple(fold_search_text(value or "") for value in (row[3], row[11], row[4], row[5], row[6]))
+        return {
+            "row": row[:4],
+            "fields": fields,
+            "text": "\n".join(fields),
+            # 단어 앞에 구분 문자를 붙여 두면 접두어 검색이 부분 문자열 검색 한 번으로 끝남
+            "words": "".join("\0" + word for word in SEARCH_WORD_PATTERN.findall("\n".join(fields))),
+            "baseModel": (row[6] or "").lower(),
+            "modelType": (row[7] or "").lower(),
+            "tags": tags.get(row[0], set()),
+            "fileSize": row[8] or 0,
+            "addedAt": row[9] or 0,
+            "createdAt": row[10] or "",
+        }
+
+    def _matches(self, entry, terms, filters, prefix):
+        base_model, model_type, tag, min_size, max_size = filters
+        if base_model and entry["baseModel"] != base_model:
+            return False
+        if model_type and entry["modelType"] != model_type:
+            return False
+        if tag and tag not in entry["tags"]:
+            return False
+        if min_size is not None and entry["fileSize"] < min_size:
+            return False
+        if max_size is not None and entry["fileSize"] > max_size:
+            return False
+        if prefix:
+            words = entry["words"]
+            return all("\0" + word in words for word in terms)
+        text = entry["text"]
+        return all(term in text for term in terms)
+
+    def _score(self, entry, terms):
+        return sum(max((weight for weight, field in zip(self.FIELD_WEIGHTS, entry["fields"]) if term in field),
+                       default=0.0)
+                   for term in terms)
+
+    def _sorted(self, matched, terms, sort):
+        # 후보 목록은 이름순이고 정렬은 안정 정렬이므로 같은 값끼리는 이름순으로 남음
+        if sort == "relevance" and terms:
+            return sorted(matched, key=lambda entry: (-self._score(entry, terms), entry["fields"][0]))
+        if sort in ("newest", "created", "size"):
+            key = {"newest": "addedAt", "created": "createdAt", "size": "fileSize"}[sort]
+            return sorted(matched, key=lambda entry: entry[key], reverse=True)
+        return matched
+
+    # -> (정렬된 결과 항목, 접두어 검색으로 찾았는지)
+    def _search(self, keyword, filters, sort):
+        if self.entries is None:
+            self.entries = self._load()
+        candidates = self.entries
+        narrowed_prefix = False
+        if self.last is not None:
+            last_keyword, last_filters, last_sort, last_matched, last_prefix = self.last
+            # 직전 검색어를 이어 쓴 경우 결과는 직전 결과의 부분집합
+            if (last_filters, last_sort) == (filters, sort) and keyword.startswith(last_keyword):
+                candidates = last_matched
+                narrowed_prefix = last_prefix
+        terms = keyword.split()
+        # 접두어 검색은 단어 단위 (FTS5 처럼 문자/숫자가 없는 검색어는 건너뛰고,
+        # 단어가 하나도 없으면 접두어로는 아무것도 찾지 않은 것으로 봄)
+        words = [word for term in terms for word in SEARCH_WORD_PATTERN.findall(term)]
+        if terms and not words:
+            matched = []
+        else:
+            matched = [entry for entry in candidates if self._matches(entry, words, filters, True)]
+        prefix = bool(matched) or not terms
+        if not prefix:
+            # 단어 중간에 있는 글자로 검색한 경우 (직전 결과를 접두어로 찾았으면 전체에서 다시 찾음)
+            if narrowed_prefix:
+                candidates = self.entries
+            matched = [entry for entry in candidates if self._matches(entry, terms, filters, False)]
+        return self._sorted(matched, terms, sort), prefix
+
+    def search(self, keyword, base_model=None, model_type=None, tag=None,
+               min_size=None, max_size=None, sort="relevance"):
+        keyword = " ".join(fold_search_text(keyword).split())
+        filters = ((base_model or "").lower(), (model_type or "").lower(), (tag or "").lower(), min_size, max_size)
+        key = (keyword, filters, sort)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                matched, prefix = self.cache[key]
+            else:
+                matched, prefix = self._search(keyword, filters, sort)
+                self.cache[key] = (matched, prefix)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            self.last = (keyword, filters, sort, matched, prefix)
+            return [entry["row"] for entry in matched]
+
+# 해시 캐시 조회 (path, size, mtime_ns, inode 가 모두 일치할 때만 유효)
+def get_cached_hashes(file_path, st=None):
+    st = st or os.stat(file_path)
+    init_db()
+    row = db_read().execute(
+        "SELECT size, mtime_ns, inode, sha256, autov2, autov3 FROM file_hashes WHERE path = ?",
+        (str(Path(file_path).resolve()),)
+    ).fetchone()
+    if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+        return {"sha256": row[3], "autov2": row[4] or row[3][:10].upper(), "autov3": row[5]}
+    return None
+
+def get_cached_sha256(file_path, st=None):
+    hashes = get_cached_hashes(file_path, st)
+    return hashes["sha256"] if hashes else None
+
+# 해시 캐시 저장 (식별 정보가 바뀌었으면 덮어써서 무효화)
+def store_cached_hashes(file_path, hashes, st=None):
+    st = st or os.stat(file_path)
+    init_db()
+    with db_write() as conn:
+        conn.execute("""
+            REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256, autov2, autov3)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (str(Path(file_path).resolve()), st.st_size, st.st_mtime_ns, st.st_ino,
+              hashes["sha256"], hashes["autov2"], hashes["autov3"]))
+
+# 해시 값(SHA256, AutoV2, AutoV3 중 아무거나)으로 파일 찾기
+def find_files_by_hash(hash_value):
+    hash_value = hash_value.strip().lower()
+    init_db()
+    rows = db_read().execute("""
+        SELECT path FROM file_hashes
+        WHERE sha256 = ? OR lower(autov2) = ? OR lower(autov3) = ?
+        ORDER BY path
+    """, (hash_value, hash_value, hash_value)).fetchall()
+    return [row[0] for row in rows]
+
+# 내용이 같은 파일 묶음 찾기 (전체 해시 또는 텐서 데이터 해시 기준)
+def find_duplicate_files():
+    init_db()
+    rows = db_read().execute("""
+        SELECT group_concat(path, '\n') FROM file_hashes
+        GROUP BY coalesce(autov3, sha256) HAVING count(*) > 1
+    """).fetchall()
+    return [row[0].split("\n") for row in rows]
+
+# 조회 실패한 파일이 아직 재시도 대기 중인지 확인 (파일이 바뀌면 바로 재시도)
+def is_lookup_suppressed(file_path, st=None):
+    st = st or os.stat(file_path)
+    init_db()
+    row = db_read().execute(
+        "SELECT size, mtime_ns, next_retry FROM lookup_failures WHERE path = ?",
+        (str(Path(file_path).resolve()),)
+    ).fetchone()
+    return bool(row and row[:2] == (st.st_size, st.st_mtime_ns) and row[2] > time.time())
+
+# 조회 결과 기록: 성공하면 실패 기록 삭제, 실패하면 횟수에 따라 재시도 간격을 늘림
+# results: [(파일 경로, sha256, 실패 상태 또는 None)]
+def record_lookup_results(results):
+    now = time.time()
+    max_delay = get_setting("lookup_retry_max_hours") * 3600
+    init_db()
+    with db_write() as conn:
+        c = conn.cursor()
+        for file_path, sha256, status in results:
+            path = str(Path(file_path).resolve())
+            if status is None:
+                c.execute("DELETE FROM lookup_failures WHERE path = ?", (path,))
+                continue
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            c.execute("SELECT size, mtime_ns, attempts FROM lookup_failures WHERE path = ?", (path,))
+            row = c.fetchone()
+            attempts = row[2] + 1 if row and row[:2] == (st.st_size, st.st_mtime_ns) else 1
+            # 모델이 없는 경우는 길게, 일시적인 HTTP 오류는 짧게 기다림
+            if status == "not_found":
+                base_delay = get_setting("lookup_retry_hours") * 3600
+            else:
+                base_delay = get_setting("lookup_error_retry_minutes") * 60
+            delay = min(base_delay * (2 ** (attempts - 1)), max_delay)
+            c.execute("""
+                REPLACE INTO lookup_failures
+                    (path, size, mtime_ns, sha256, status, attempts, last_attempt, next_retry)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (path, st.st_size, st.st_mtime_ns, sha256, status, attempts, now, now + delay))
+
+# 한 번 읽으면서 모든 해시 계산 (큰 버퍼로 읽어서 hashlib 이 GIL 을 놓도록 함)
+# - sha256: 파일 전체
+# - autov2: sha256 앞 10자리
+# - autov3: safetensors 헤더(8바이트 길이 + JSON)를 제외한 텐서 데이터의 sha256 앞 12자리
+def _hash_file(file_path, buffer_size=None):
+    buffer_size = buffer_size or get_setting("hash_buffer_mb") * 1024 * 1024
     sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    tensor_hash = None
+    tensor_offset = None
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with metrics.span("hash", file=Path(file_path).name) as span, open(file_path, "rb", buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        span["bytes"] = file_size
+        position = 0
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            if position == 0 and str(file_path).endswith(".safetensors") and n >= 8:
+                header_length = int.from_bytes(buffer[:8], "little")
+                if 8 + header_length <= file_size:
+                    tensor_offset = 8 + header_length
+                    tensor_hash = hashlib.sha256()
+            sha256_hash.update(view[:n])
+            if tensor_hash and position + n > tensor_offset:
+                tensor_hash.update(view[max(0, tensor_offset - position):n])
+            position += n
+    metrics.count("hash_bytes", file_size)
+
     hex_digest = sha256_hash.hexdigest()
+    return {
+        "sha256": hex_digest,
+        "autov2": hex_digest[:10].upper(),
+        "autov3": tensor_hash.hexdigest()[:12].upper() if tensor_hash else None,
+    }
+
+# 모든 해시 계산 (캐시 우선)
+def compute_hashes(file_path):
+    st = os.stat(file_path)
+    cached = get_cached_hashes(file_path, st)
+    if cached:
+        return cached
+
+    hashes = _hash_file(file_path)
+    store_cached_hashes(file_path, hashes, st)
+    return hashes
+
+# SHA256 해시 계산 (캐시 우선)
+def compute_sha256(file_path):
+    hex_digest = compute_hashes(file_path)["sha256"]
     #print(f"[DEBUG] {file_path.name} SHA256: {hex_digest}")
     return hex_digest
 
-# civitai에서 모델 정보 조회
-def fetch_model_info_by_hash(sha256):
-    url_by_hash = f"https://civitai.com/api/v1/model-versions/by-hash/{sha256}"
-    response = requests.get(url_by_hash)
-    if response.status_code != 200:
-        print(f"요청 실패: {response.status_code}")
-        return None
+# 여러 파일을 병렬로 해시 계산하여 (파일, 해시들)을 끝나는 순서대로 반환
+def hash_files(files, workers=None):
+    workers = workers or get_setting("hash_workers")
 
-    version_info = response.json()
+    # 캐시에 있는 파일은 바로 넘겨줌
+    pending = []
+    for file in files:
+        try:
+            st = os.stat(file)
+        except OSError as e:
+            print(f"파일 정보를 읽을 수 없습니다: {file} ({e})")
+            continue
+        cached = get_cached_hashes(file, st)
+        if cached:
+            metrics.count("hash_cache_hits")
+            yield file, cached
+        else:
+            pending.append((file, st))
+
+    if not pending:
+        return
+
+    # 큰 파일부터 시작해야 마지막에 큰 파일 하나만 남는 상황을 피할 수 있음
+    pending.sort(key=lambda item: item[1].st_size, reverse=True)
+    total_bytes = sum(st.st_size for _, st in pending)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_hash_file, file): (file, st) for file, st in pending}
+        try:
+            for future in as_completed(futures):
+                file, st = futures[future]
+                try:
+                    hashes = future.result()
+                except OSError as e:
+                    print(f"해시 계산 실패: {file} ({e})")
+                    continue
+                store_cached_hashes(file, hashes, st)
+                yield file, hashes
+        finally:
+            # 받는 쪽이 중간에 그만두면 아직 시작하지 않은 해시는 취소
+            for future in futures:
+                future.cancel()
+
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    total_mb = total_bytes / (1024 * 1024)
+    print(f"해시 계산 완료: {len(pending)}개 파일, {total_mb:.1f} MB, {total_mb / elapsed:.1f} MB/s ({workers} workers)")
+
+# 재시도 후에도 200 이 아닌 응답
+class CivitaiAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+# 토큰 버킷 속도 제한 (초당 rate 개, 최대 capacity 개까지 몰아서 허용)
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# URL 안의 해시 값 (성능 기록에서 엔드포인트를 묶을 때 사용)
+API_ID_PATTERN = re.compile(r"[0-9a-fA-F]{10,}")
+
+# Civitai API 클라이언트 (연결 재사용, 동시 요청 수 제한, 429/5xx 재시도)
+class CivitaiClient:
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url=None, concurrency=None, rate=None, max_retries=None, timeout=None):
+        self.base_url = (base_url or get_setting("api_base_url")).rstrip("/")
+        self.concurrency = concurrency or get_setting("api_concurrency")
+        self.max_retries = get_setting("api_max_retries") if max_retries is None else max_retries
+        self.timeout = timeout or get_setting("api_timeout")
+        rate = get_setting("api_rate_per_sec") if rate is None else rate
+        self.bucket = TokenBucket(rate, max(1, self.concurrency))
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _retry_delay(self, response, attempt):
+        # Retry-After 헤더가 있으면 따르고, 없으면 지수 백오프
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return min(max(retry_at.timestamp() - time.time(), 0.0), 60.0)
+                except (TypeError, ValueError):
+                    pass
+        return min(0.5 * (2 ** attempt), 30.0) * (0.5 + random.random() / 2)
+
+    # 성능 기록용 엔드포인트 이름 (해시/ID 는 하나로 묶고, API 밖의 주소는 download)
+    def _endpoint(self, url):
+        if not url.startswith(self.base_url + "/"):
+            return "download"
+        parts = url[len(self.base_url) + 1:].split("?")[0].strip("/").split("/")
+        return "/".join("{id}" if part.isdigit() or API_ID_PATTERN.fullmatch(part) else part for part in parts)
+
+    def request(self, method, url, **kwargs):
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        kwargs.setdefault("timeout", self.timeout)
+
+        endpoint = self._endpoint(url)
+        attempt = 0
+        while True:
+            response = None
+            error = None
+            # 초당 요청 수/동시 요청 수 제한으로 기다린 시간은 따로 집계
+            # (초당 요청 수 제한은 API 에만 적용, 미리보기 다운로드는 동시 요청 수만 제한)
+            with metrics.span("api_wait", log=False):
+                if endpoint != "download":
+                    self.bucket.acquire()
+                self.semaphore.acquire()
+            try:
+                start = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+            finally:
+                self.semaphore.release()
+            # 스트리밍 다운로드는 응답 헤더를 받을 때까지의 시간
+            status = type(error).__name__ if error is not None else response.status_code
+            metrics.observe("api_request", time.perf_counter() - start, method=method, endpoint=endpoint,
+                            status=status, attempt=attempt)
+            metrics.count("api_requests", endpoint=endpoint, status=status)
+
+            retryable = error is not None or response.status_code in self.RETRY_STATUS
+            if not retryable or attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._retry_delay(response, attempt)
+            reason = error if error is not None else response.status_code
+            print(f"재시도 대기 {delay:.1f}초 ({reason}): {url}")
+            metrics.count("api_retries", endpoint=endpoint, status=status)
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get_version_by_hash(self, hash_value):
+        # 없는 해시는 None, 그 밖의 실패는 CivitaiAPIError
+        response = self.request("GET", f"model-versions/by-hash/{hash_value}")
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise CivitaiAPIError(response.status_code)
+        return response.json()
+
+    def get_versions_by_hashes(self, hash_values):
+        # 여러 해시를 한 번에 조회 (응답은 찾은 버전들의 목록)
+        response = self.request("POST", "model-versions/by-hash", json=list(hash_values))
+        if response.status_code != 200:
+            raise CivitaiAPIError(response.status_code)
+        return response.json()
+
+    def get_version(self, version_id):
+        response = self.request("GET", f"model-versions/{version_id}")
+        if response.status_code != 200:
+            raise CivitaiAPIError(response.status_code)
+        return response.json()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CivitaiClient()
+        return _client
+
+# DB 와 미리보기 저장에 실제로 쓰는 필드 (by-hash 응답에 없을 때만 상세 조회)
+REQUIRED_VERSION_FIELDS = ("id", "modelId", "model", "trainedWords", "images")
+
+def _complete_version_info(client, version_info):
+    if all(field in version_info for field in REQUIRED_VERSION_FIELDS):
+        return version_info
     model_version_id = version_info.get("id")
     if not model_version_id:
         print("모델 버전 ID를 찾을 수 없습니다.")
         return None
+    return client.get_version(model_version_id)
 
-    url_by_id = f"https://civitai.com/api/v1/model-versions/{model_version_id}"
-    response = requests.get(url_by_id)
-    if response.status_code != 200:
-        print(f"상세 정보 요청 실패: {response.status_code}")
-        return None
+def _failure_status(error):
+    if isinstance(error, CivitaiAPIError):
+        return f"http_{error.status_code}"
+    return "error"
+
+# 해시 하나 조회하여 (버전 정보, 실패 상태) 반환
+def _lookup_hash(client, sha256):
+    try:
+        version_info = client.get_version_by_hash(sha256)
+        if version_info is None:
+            return None, "not_found"
+        version = _complete_version_info(client, version_info)
+        return version, None if version else "not_found"
+    except (requests.RequestException, CivitaiAPIError) as e:
+        print(f"요청 실패: {e}")
+        return None, _failure_status(e)
+
+# civitai에서 모델 정보 조회
+def fetch_model_info_by_hash(sha256):
+    version, _ = _lookup_hash(get_client(), sha256)
+    return version
+
+# 일괄 조회 엔드포인트를 지원하지 않는다는 뜻의 응답 (이때만 하나씩 조회로 바꿈)
+BULK_UNSUPPORTED_STATUS = (400, 404, 405)
+
+# 여러 해시를 일괄 조회하여 ({sha256: 버전 정보}, {sha256: 실패 상태}) 반환
+def fetch_model_info_by_hashes(sha256_list):
+    client = get_client()
+    wanted = {h.lower() for h in sha256_list}
+    results = {}
+    failures = {}
+    try:
+        versions = client.get_versions_by_hashes(sorted(wanted))
+    except (requests.RequestException, CivitaiAPIError) as e:
+        print(f"일괄 조회 실패: {e}")
+        if not (isinstance(e, CivitaiAPIError) and e.status_code in BULK_UNSUPPORTED_STATUS):
+            # 연결 실패, 429/5xx 는 하나씩 다시 보내도 같은 상황이므로 전체를 실패로 기록
+            # (재시도 대기 시간이 지난 뒤 다시 조회함)
+            status = _failure_status(e)
+            return results, {sha256: status for sha256 in wanted}
+        # 일괄 조회를 지원하지 않는 서버면 하나씩 조회
+        for sha256 in wanted:
+            version, status = _lookup_hash(client, sha256)
+            if version:
+                results[sha256] = version
+            else:
+                failures[sha256] = status
+        return results, failures
+
+    for version_info in versions:
+        matched = [
+            file_info.get("hashes", {}).get("SHA256", "").lower()
+            for file_info in version_info.get("files", [])
+        ]
+        matched = [h for h in matched if h in wanted and h not in results]
+        if not matched:
+            continue
+        try:
+            version = _complete_version_info(client, version_info)
+        except (requests.RequestException, CivitaiAPIError) as e:
+            print(f"상세 정보 요청 실패: {e}")
+            for sha256 in matched:
+                failures[sha256] = _failure_status(e)
+            continue
+        for sha256 in matched:
+            if version:
+                results[sha256] = version
+            else:
+                failures[sha256] = "not_found"
+
+    for sha256 in wanted:
+        if sha256 not in results and sha256 not in failures:
+            failures[sha256] = "not_found"
+    return results, failures
 
-    detailed_info = response.json()
-    return detailed_info
+# Content-Range: bytes 0-99/1234 에서 전체 크기 추출
+def _content_range_total(response):
+    content_range = response.headers.get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
 
 # 미리보기 이미지 또는 동영상 다운로드
+# 임시 파일(.part)에 받은 뒤 크기를 확인하고 이름을 바꾸므로 중간에 끊겨도 잘린 파일이 남지 않음.
+# 남아 있는 .part 파일은 Range 요청으로 이어서 받음.
 def download_file(url, save_path):
-    response = requests.get(url, stream=True)
-    if response.status_code == 200:
-        with open(save_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    with metrics.span("download", file=Path(save_path).name) as span:
+        ok = _download_file(url, save_path)
+        span["status"] = "ok" if ok else "failed"
+        if ok:
+            span["bytes"] = os.path.getsize(save_path)
+            metrics.count("download_bytes", span["bytes"])
+        metrics.count("downloads", status=span["status"])
+        return ok
+
+def _download_file(url, save_path):
+    save_path = Path(save_path)
+    part_path = save_path.with_name(save_path.name + ".part")
+    chunk_size = get_setting("download_chunk_kb") * 1024
+    timeout = (10, get_setting("download_timeout"))
+
+    for attempt in range(get_setting("download_max_resumes") + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            response = get_client().request("GET", url, stream=True, headers=headers, timeout=timeout)
+            with response:
+                if response.status_code == 416 and offset:
+                    # 이미 다 받은 상태이거나 .part 가 원본과 맞지 않음
+                    if _content_range_total(response) == offset:
+                        os.replace(part_path, save_path)
+                        return True
+                    part_path.unlink()
+                    continue
+                if response.status_code == 206 and offset:
+                    mode = "ab"
+                    total = _content_range_total(response)
+                elif response.status_code == 200:
+                    # 서버가 Range 를 무시하면 처음부터 다시 받음
+                    mode = "wb"
+                    offset = 0
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length and length.isdigit() else None
+                else:
+                    print(f"다운로드 실패: {response.status_code} {url}")
+                    return False
+
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+        except (requests.RequestException, CivitaiAPIError, OSError) as e:
+            print(f"다운로드 중단 ({attempt + 1}회): {save_path.name} ({e})")
+            continue
+
+        size = part_path.stat().st_size
+        if total is not None and size != total:
+            print(f"다운로드 크기 불일치 ({size}/{total}), 이어받기 시도: {save_path.name}")
+            if size > total:
+                part_path.unlink()
+            continue
+        os.replace(part_path, save_path)
         return True
+
+    print(f"다운로드 실패 (다음 실행 때 이어받음): {save_path.name}")
     return False
 
 # 대표 미리보기 URL 선택
@@ -125,70 +1331,934 @@ def get_preview_url(version):
             return url, "video"
     return None, None
 
-# safetensors 파일 처리 및 메타데이터 저장
-def process_safetensors_files(folder_path):
-    folder = Path(folder_path)
-    for file in folder.glob("*.safetensors"):
-        print(f"처리 중: {file.name}")
-        
-        # 미리보기와 JSON 파일이 모두 존재하는지 확인
-        info_path = file.with_suffix(".civitai.info.json")
-        preview_path = file.with_suffix(".preview.png")
-        video_preview_path = file.with_suffix(".preview.mp4")
-        
-        if info_path.exists() and (preview_path.exists() or video_preview_path.exists()):
-            print(f"스킵: 이미 모든 파일이 존재합니다: {file.name}")
-            continue
-        
-        # 파일이 존재하지 않는 경우만 처리
-        sha256 = compute_sha256(file)
-        version = fetch_model_info_by_hash(sha256)
-
-        if version:
-            # JSON 파일이 이미 존재하는지 확인
-            if not info_path.exists():
-                with open(info_path, "w", encoding="utf-8") as f:
-                    json.dump(version, f, ensure_ascii=False, indent=4)
-                print(f"메타데이터 저장 완료: {info_path.name}")
-            else:
-                print(f"스킵: 이미 존재하는 메타데이터 파일: {info_path.name}")
-
-            preview_url, media_type = get_preview_url(version)
-            if preview_url:
-                ext = ".preview.png" if media_type == "image" else ".preview.mp4"
-                save_path = file.with_suffix(ext)
-                # 미리보기 파일이 이미 존재하는지 확인
-                if not save_path.exists():
-                    if download_file(preview_url, save_path):
-                        print(f"{media_type.upper()} 미리보기 저장 완료: {save_path.name}")
-                else:
-                    print(f"스킵: 이미 존재하는 미리보기 파일: {save_path.name}")
-        else:
-            print(f"⚠️ 모델 정보를 찾을 수 없습니다: {file.name}")
+# Civitai 이미지 서버에 줄인 크기를 요청하는 주소
+# (https://image.civitai.com/<키>/<이미지 ID>/<옵션>/<파일 이름> 의 옵션 부분에 width=N 을 넣음,
+#  원본 크기를 알면 긴 쪽이 최대 크기가 되도록 가로 폭을 계산함)
+def sized_preview_url(url, width=None, height=None, max_dimension=None):
+    max_dimension = get_setting("preview_max_dimension") if max_dimension is None else max_dimension
+    parsed = urlsplit(url)
+    if not max_dimension or not (parsed.hostname or "").endswith("civitai.com"):
+        return url
+    target = max_dimension
+    if width and height:
+        if max(width, height) <= max_dimension:
+            return url
+        target = max(1, round(width * max_dimension / max(width, height)))
+
+    parts = parsed.path.split("/")
+    if len(parts) == 5 and "=" in parts[3]:
+        # 이미 있는 크기 옵션만 바꾸고 나머지(transcode=true 등)는 유지
+        options = [option for option in parts[3].split(",")
+                   if option and not option.startswith(("width=", "height=", "original="))]
+        parts[3] = ",".join(options + [f"width={target}"])
+    elif len(parts) == 4:
+        parts.insert(3, f"width={target}")
+    else:
+        return url
+    return urlunsplit(parsed._replace(path="/".join(parts)))
+
+# 모델 폴더 목록 (폴더 하나 또는 여러 개) -> 중복 없는 절대 경로 목록
+def model_roots(folders):
+    if isinstance(folders, (str, os.PathLike)):
+        folders = [folders]
+    roots = []
+    for folder in folders:
+        root = Path(folder).expanduser().resolve()
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+def _is_under(path, roots):
+    return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+# 폴더 하나 읽기 -> (폴더 수정 시각, {파일 이름: (size, mtime_ns) 또는 None}, [하위 폴더])
+def _scan_directory(path, suffixes, exclude, with_stat):
+    mtime_ns = os.stat(path).st_mtime_ns  # 읽는 도중 바뀌면 다음 번에 다시 읽도록 먼저 기록
+    files = {}
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if any(fnmatch.fnmatch(entry.name, pattern) or fnmatch.fnmatch(entry.path, pattern)
+                   for pattern in exclude):
+                continue
+            try:
+                # 심볼릭 링크 폴더는 따라가지 않음 (순환 방지)
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(suffixes):
+                    if with_stat:
+                        st = entry.stat()
+                        files[entry.name] = (st.st_size, st.st_mtime_ns)
+                    else:
+                        files[entry.name] = None
+            except OSError:
+                continue  # 그 사이 지워진 항목
+    return mtime_ns, files, subdirs
+
+# 목록이 그대로인 폴더의 파일 정보만 다시 읽음 (파일 내용만 바뀌면 폴더 수정 시각은 그대로임)
+def _stat_files(path, names):
+    files = {}
+    for name in names:
+        try:
+            st = os.stat(os.path.join(path, name))
+        except OSError:
+            continue  # 그 사이 지워진 파일 (폴더 수정 시각이 바뀌었으므로 다음 번에 다시 읽음)
+        files[name] = (st.st_size, st.st_mtime_ns)
+    return files
+
+# 여러 폴더를 하위 폴더까지 병렬로 읽음 -> {폴더: (수정 시각, 파일, 하위 폴더)}
+# cache 에 있는 폴더는 수정 시각이 같으면 목록을 다시 읽지 않고 하위 폴더만 확인함
+# (폴더 수정 시각은 바로 아래 항목이 추가/삭제/이름 변경될 때 바뀜, rescan 의 폴더는 항상 다시 읽음)
+# with_stat 이면 목록이 그대로인 폴더도 파일 크기/수정 시각은 항상 새로 읽음
+def walk_directories(roots, suffixes, exclude=(), cache=None, with_stat=False, rescan=(), workers=None):
+    cache = cache or {}
+    workers = workers or get_setting("discovery_workers")
+
+    def visit(path):
+        cached = cache.get(path)
+        try:
+            if cached is not None and path not in rescan and os.stat(path).st_mtime_ns == cached[0]:
+                if with_stat:
+                    return path, (cached[0], _stat_files(path, cached[1]), cached[2])
+                return path, cached
+            return path, _scan_directory(path, suffixes, exclude, with_stat)
+        except OSError as e:
+            print(f"폴더를 읽을 수 없습니다: {path} ({e})")
+            return path, None
+
+    listings = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(visit, str(root)) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, listing = future.result()
+                if listing is None or path in listings:
+                    continue
+                listings[path] = listing
+                pending |= {executor.submit(visit, subdir) for subdir in listing[2] if subdir not in listings}
+    return listings
+
+# 모든 모델 폴더에서 모델 파일 찾기 (폴더 목록은 DB 의 dir_cache 에 보관)
+def discover_model_files(folders, workers=None):
+    init_db()
+    roots = [str(root) for root in model_roots(folders)]
+    suffixes = tuple(ext.lower() for ext in get_setting("model_extensions"))
+    exclude = tuple(get_setting("exclude_patterns"))
+    # 확장자/제외 규칙이 바뀌면 이전 목록은 쓰지 않음
+    signature = json.dumps([suffixes, exclude])
+    cache = {}
+    for path, mtime_ns, files, subdirs in db_read().execute(
+            "SELECT path, mtime_ns, files, subdirs FROM dir_cache WHERE filter = ?", (signature,)):
+        cache[path] = (mtime_ns, dict.fromkeys(json.loads(files)), json.loads(subdirs))
+
+    start = time.perf_counter()
+    listings = walk_directories(roots, suffixes, exclude, cache, workers=workers)
+    rescanned = [(path, listing) for path, listing in listings.items() if listing is not cache.get(path)]
+    gone = [(path,) for path in cache if path not in listings and _is_under(path, roots)]
+    if rescanned or gone:
+        with db_write() as conn:
+            conn.executemany(
+                "REPLACE INTO dir_cache (path, mtime_ns, filter, files, subdirs) VALUES (?, ?, ?, ?, ?)",
+                [(path, mtime_ns, signature, json.dumps(sorted(files)), json.dumps(subdirs))
+                 for path, (mtime_ns, files, subdirs) in rescanned])
+            conn.executemany("DELETE FROM dir_cache WHERE path = ?", gone)
+
+    model_files = sorted(Path(path) / name for path, (_, files, _) in listings.items() for name in files)
+    elapsed = time.perf_counter() - start
+    metrics.observe("discover", elapsed, files=len(model_files), dirs=len(listings), rescanned=len(rescanned))
+    print(f"모델 파일 찾기: {len(model_files)}개 (폴더 {len(listings)}개 중 {len(rescanned)}개 다시 읽음, "
+          f"{elapsed:.2f}초)")
+    return model_files
+
+# safetensors 파일 처리 및 메타데이터 저장
+# folders 는 폴더 하나 또는 여러 개 (하위 폴더 포함)
+# files 를 주면 폴더 전체 대신 그 모델 파일들만 처리
+# progress(단계, **정보) 는 작업 스레드에서 호출됨:
+#   "start" (total, total_bytes), "hashed" (file, size), "fetched" (count), "saved" (file, found, status, size)
+#   status 는 찾았으면 None, 없는 모델이면 "not_found", 요청 실패면 "http_429"/"error" 등
+# cancel_event 가 설정되면 아직 시작하지 않은 파일은 처리하지 않음
+def process_safetensors_files(folders, workers=None, files=None, progress=None, cancel_event=None):
+    init_db()
+    pending = []
+    suppressed = 0
+    for file in (discover_model_files(folders) if files is None else files):
+        # 미리보기와 JSON 파일이 모두 존재하는지 확인
+        info_path = file.with_suffix(".civitai.info.json")
+        preview_path = file.with_suffix(".preview.png")
+        video_preview_path = file.with_suffix(".preview.mp4")
+        
+        if info_path.exists() and (preview_path.exists() or video_preview_path.exists()):
+            print(f"스킵: 이미 모든 파일이 존재합니다: {file.name}")
+            continue
+        # 최근에 조회 실패한 파일은 재시도 시각까지 해시/조회하지 않음
+        if is_lookup_suppressed(file):
+            suppressed += 1
+            continue
+        pending.append(file)
+    if suppressed:
+        print(f"스킵: 최근 조회에 실패한 모델 {suppressed}개 (재시도 대기 중)")
+    sizes = {}
+    for file in pending:
+        try:
+            sizes[file] = file.stat().st_size
+        except OSError:
+            sizes[file] = 0
+    if progress:
+        progress("start", total=len(pending), total_bytes=sum(sizes.values()))
+
+    # 파일이 존재하지 않는 경우만 처리 (해시가 끝나는 대로 모아서 일괄 조회)
+    batch_size = get_setting("api_batch_size")
+    concurrency = get_setting("api_concurrency")
+    # 해시는 별도 스레드에서 계산해서 큐로 받음 (큰 파일을 해시하는 동안에도 모인 만큼 먼저 조회)
+    hashed = Queue()
+
+    def feed_hashes():
+        try:
+            for item in hash_files(pending, workers):
+                hashed.put(item)
+                if cancel_event is not None and cancel_event.is_set():
+                    break  # 아직 시작하지 않은 해시는 hash_files 가 취소함
+        except Exception as e:
+            print(f"해시 계산 중 오류 발생: {e}")
+        finally:
+            hashed.put(None)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as download_executor:
+        with ThreadPoolExecutor(max_workers=concurrency) as lookup_executor:
+            lookups = []
+            batch = []
+            batch_deadline = None
+            feeder = threading.Thread(target=feed_hashes, daemon=True)
+            feeder.start()
+            done = False
+            while not done:
+                timeout = None if batch_deadline is None else max(0.0, batch_deadline - time.monotonic())
+                try:
+                    item = hashed.get(timeout=timeout)
+                except Empty:
+                    item = ()  # 기다린 지 2초가 넘음
+                if cancel_event is not None and cancel_event.is_set():
+                    print("취소: 남은 파일은 처리하지 않습니다")
+                    break
+                done = item is None
+                if item:
+                    file, hashes = item
+                    if progress:
+                        progress("hashed", file=file, size=sizes.get(file, 0))
+                    if not batch:
+                        batch_deadline = time.monotonic() + 2.0
+                    batch.append((file, hashes))
+                # 가득 찼거나, 해시 계산이 오래 걸려 기다린 지 2초가 넘었거나, 해시가 모두 끝나면 보냄
+                if batch and (not item or len(batch) >= batch_size):
+                    lookups.append(lookup_executor.submit(_lookup_batch, batch, download_executor,
+                                                          progress, cancel_event))
+                    batch = []
+                    batch_deadline = None
+            feeder.join()
+
+        saves = []
+        for future in lookups:
+            try:
+                saves.extend(future.result())
+            except Exception as e:
+                print(f"모델 처리 중 오류 발생: {e}")
+        for future in as_completed(saves):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"모델 처리 중 오류 발생: {e}")
+
+# 모아 둔 파일들을 한 번에 조회하고 저장 작업을 넘김
+def _lookup_batch(batch, executor, progress=None, cancel_event=None):
+    if cancel_event is not None and cancel_event.is_set():
+        return []
+    versions, failures = fetch_model_info_by_hashes([hashes["sha256"] for _, hashes in batch])
+    record_lookup_results(
+        [(file, hashes["sha256"], failures.get(hashes["sha256"].lower())) for file, hashes in batch]
+    )
+    if progress:
+        progress("fetched", count=len(batch))
+    return [
+        executor.submit(_save_model_files, file, versions.get(hashes["sha256"].lower()),
+                        failures.get(hashes["sha256"].lower()), progress, cancel_event)
+        for file, hashes in batch
+    ]
+
+# 모델 하나의 메타데이터와 미리보기 저장 (status 는 조회 실패 상태, 찾았으면 None)
+def _save_model_files(file, version, status=None, progress=None, cancel_event=None):
+    if cancel_event is not None and cancel_event.is_set():
+        return
+    print(f"처리 중: {file.name}")
+    downloaded = 0
+    info_path = file.with_suffix(".civitai.info.json")
+
+    if version:
+        # JSON 파일이 이미 존재하는지 확인
+        if not info_path.exists():
+            with open(info_path, "w", encoding="utf-8") as f:
+                json.dump(version, f, ensure_ascii=False, indent=4)
+            print(f"메타데이터 저장 완료: {info_path.name}")
+        else:
+            print(f"스킵: 이미 존재하는 메타데이터 파일: {info_path.name}")
+
+        preview_url, media_type = get_preview_url(version)
+        if preview_url:
+            ext = ".preview.png" if media_type == "image" else ".preview.mp4"
+            save_path = file.with_suffix(ext)
+            # 미리보기 파일이 이미 존재하는지 확인
+            if not save_path.exists():
+                # 원본 대신 줄인 크기를 받고, 줄인 주소가 실패하면 원본을 받음
+                image = next((img for img in version.get("images", []) if img.get("url") == preview_url), {})
+                sized_url = sized_preview_url(preview_url, image.get("width"), image.get("height"))
+                saved = download_file(sized_url, save_path)
+                if not saved and sized_url != preview_url:
+                    # 줄인 주소로 받던 .part 가 원본에 이어 붙지 않도록 지움
+                    save_path.with_name(save_path.name + ".part").unlink(missing_ok=True)
+                    saved = download_file(preview_url, save_path)
+                if saved:
+                    print(f"{media_type.upper()} 미리보기 저장 완료: {save_path.name}")
+                    downloaded = save_path.stat().st_size
+                    if media_type == "image":
+                        shrink_preview_image(save_path)
+                    else:
+                        # 그리드에서 동영상을 열지 않도록 받을 때 포스터를 만들어 둠
+                        extract_poster_frame(save_path)
+            else:
+                print(f"스킵: 이미 존재하는 미리보기 파일: {save_path.name}")
+    elif status in (None, "not_found"):
+        print(f"⚠️ 모델 정보를 찾을 수 없습니다: {file.name} (다음 재시도까지 건너뜀)")
+    else:
+        # 네트워크/서버 문제라 모델이 없다는 뜻은 아님
+        print(f"⚠️ 모델 정보 조회 실패 ({status}): {file.name} (다음 재시도까지 건너뜀)")
+    if progress:
+        progress("saved", file=file, found=bool(version), status=None if version else status or "not_found",
+                 size=downloaded)
+
+# 모서리 마스크 (크기별로 한 번만 만들어 재사용)
+@lru_cache(maxsize=32)
+def _rounded_mask(width, height, radius):
+    # 마스크 생성 (2배 크기로 생성하여 안티앨리어싱 효과 적용)
+    mask_size = (width * 2, height * 2)
+    mask = Image.new('L', mask_size, 0)
+    draw = ImageDraw.Draw(mask)
+    
+    # 라운드 처리된 사각형 그리기 (2배 크기로)
+    draw.rounded_rectangle([(0, 0), mask_size], radius * 2, fill=255)
+    
+    # 마스크 크기 조정 (안티앨리어싱 적용)
+    return mask.resize((width, height), Image.Resampling.LANCZOS)
+
+# 동영상 프레임에 바로 넣을 수 있는 알파 채널 배열
+@lru_cache(maxsize=32)
+def rounded_corner_alpha(width, height, radius):
+    load_video_modules()
+    alpha = np.asarray(_rounded_mask(width, height, radius), dtype=np.uint8)
+    alpha.setflags(write=False)
+    return alpha
+
+def round_corners(image, radius):
+    """이미지의 모서리를 라운드 처리하는 함수"""
+    # 이미지가 RGBA 모드가 아니면 변환
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    
+    # 새로운 이미지 생성
+    rounded = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    
+    # 마스크를 사용하여 이미지 합성
+    rounded.paste(image, mask=_rounded_mask(image.size[0], image.size[1], radius))
+    return rounded
+
+# 썸네일 캐시
+# 미리보기를 타일 크기로 줄이고 모서리를 둥글게 한 결과를 파일로 저장해 둠.
+# 키는 (원본 경로, 원본 mtime/크기, 타일 크기) 이므로 원본이 바뀌면 자동으로 새로 만들어짐.
+def thumbnail_cache_path(source, tile_size, st=None):
+    st = st or os.stat(source)
+    key = f"{Path(source).resolve()}|{st.st_mtime_ns}|{st.st_size}|{tile_size}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return Path(THUMBNAIL_CACHE_DIR) / digest[:2] / f"{digest}{THUMBNAIL_EXT}"
+
+# 동영상 미리보기의 포스터 이미지 경로 (a.preview.mp4 -> a.preview.poster.png)
+def poster_path_for(video_path):
+    return Path(video_path).with_suffix(".poster.png")
+
+# 동영상 첫 프레임을 포스터 이미지로 저장 -> 포스터 경로, 실패하면 None
+def extract_poster_frame(video_path):
+    poster_path = poster_path_for(video_path)
+    try:
+        load_video_modules()
+        cap = cv2.VideoCapture(str(video_path))
+        try:
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            print(f"포스터 생성 실패: 프레임을 읽을 수 없음 {Path(video_path).name}")
+            return None
+        tmp_path = poster_path.with_name(f"{poster_path.name}.{os.getpid()}.tmp")
+        poster = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        max_dimension = get_setting("preview_max_dimension")
+        if max_dimension:
+            poster.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        poster.save(tmp_path, format="PNG")
+        os.replace(tmp_path, poster_path)
+        return poster_path
+    except ImportError:
+        # 명령줄 모드를 OpenCV 없는 서버에서 돌린 경우 (GUI 를 열 때 만들어짐)
+        print(f"포스터 생성 건너뜀: OpenCV 가 없습니다 ({Path(video_path).name})")
+        return None
+    except Exception as e:
+        print(f"포스터 생성 실패: {Path(video_path).name} ({e})")
+        return None
+
+# 포스터가 없는 기존 동영상 미리보기에 포스터를 만들어 줌 (백그라운드 작업용)
+def backfill_video_posters(folders, workers=None, files=None):
+    pending = []
+    for model_path in (discover_model_files(folders) if files is None else files):
+        video_path = model_path.with_suffix(".preview.mp4")
+        if video_path.exists() and not poster_path_for(video_path).exists():
+            pending.append(video_path)
+    if not pending:
+        return 0
+    # OpenCV 디코딩은 GIL 을 풀기 때문에 스레드로 충분함
+    workers = workers or get_setting("thumbnail_workers") or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        created = sum(poster is not None for poster in executor.map(extract_poster_frame, pending))
+    print(f"동영상 포스터 생성: {created}/{len(pending)}개, {time.perf_counter() - start:.1f}초")
+    return created
+
+# 큰 미리보기 이미지를 최대 크기로 줄여서 다시 저장 -> (이전 바이트, 새 바이트), 그대로 두면 None
+# 원래 형식(PNG/JPEG/WebP)과 생성 정보 등 메타데이터를 그대로 유지함 (다른 도구도 같은 파일을 읽음)
+def shrink_preview_image(path, max_dimension=None, dry_run=False):
+    max_dimension = get_setting("preview_max_dimension") if max_dimension is None else max_dimension
+    path = Path(path)
+    if not max_dimension:
+        return None
+    try:
+        old_size = path.stat().st_size
+        with Image.open(path) as image:
+            # 다른 Civitai Helper 도구도 읽는 파일이므로 형식은 바꾸지 않음 (모르는 형식은 건드리지 않음)
+            save_format = image.format
+            if save_format not in ("PNG", "JPEG", "WEBP"):
+                return None
+            # 움직이는 이미지는 첫 프레임만 남게 되므로 건드리지 않음
+            if max(image.size) <= max_dimension or getattr(image, "is_animated", False):
+                return None
+            if dry_run:
+                return old_size, None
+            # 생성 정보(A1111 의 parameters, ComfyUI 의 workflow 등 PNG 텍스트)와 색 프로필은 그대로 옮김
+            text = dict(getattr(image, "text", {}))
+            metadata = {key: image.info[key] for key in ("icc_profile", "comment", "xmp") if image.info.get(key)}
+            image.draft("RGB", (max_dimension, max_dimension))  # JPEG 는 줄인 크기로 디코딩
+            image = ImageOps.exif_transpose(image)
+            # EXIF 도 유지 (방향 태그는 exif_transpose 가 반영하고 지움)
+            if image.info.get("exif"):
+                metadata["exif"] = image.info["exif"]
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            image = image.convert("RGBA" if has_alpha and save_format != "JPEG" else "RGB")
+
+        quality = get_setting("preview_quality")
+        if save_format == "PNG":
+            pnginfo = PngImagePlugin.PngInfo()
+            for key, value in text.items():
+                pnginfo.add_text(key, value)  # latin-1 로 안 되는 값은 iTXt 로 저장됨
+            metadata.pop("xmp", None)  # PNG 의 XMP 는 텍스트 청크로 이미 옮김
+            options = {"pnginfo": pnginfo, **metadata}
+        elif save_format == "JPEG":
+            options = {"quality": quality, "optimize": True, **metadata}
+        else:
+            options = {"quality": quality, "method": 4, **metadata}
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        image.save(tmp_path, format=save_format, **options)
+        new_size = tmp_path.stat().st_size
+        if new_size >= old_size:
+            tmp_path.unlink()
+            return None
+        os.replace(tmp_path, path)
+        metrics.count("preview_bytes_saved", old_size - new_size)
+        return old_size, new_size
+    except Exception as e:
+        print(f"미리보기 줄이기 실패: {path.name} ({e})")
+        return None
+
+def format_shrink_stats(stats, dry_run=False):
+    before = stats["bytes_before"] / (1024 * 1024)
+    if dry_run:
+        return f"줄일 대상: {stats['checked']}개 중 {stats['shrunk']}개 ({before:.1f} MB)"
+    after = stats["bytes_after"] / (1024 * 1024)
+    return f"줄임: {stats['checked']}개 중 {stats['shrunk']}개, {before:.1f} MB -> {after:.1f} MB"
+
+def _shrink_preview_worker(path, max_dimension, dry_run):
+    return shrink_preview_image(path, max_dimension, dry_run)
+
+# 이미 받아 둔 큰 미리보기(정지 이미지, 동영상 포스터)를 한꺼번에 줄임
+def shrink_existing_previews(folders, max_dimension=None, workers=None, files=None, dry_run=False):
+    max_dimension = get_setting("preview_max_dimension") if max_dimension is None else max_dimension
+    stats = {"checked": 0, "shrunk": 0, "bytes_before": 0, "bytes_after": 0}
+    if not max_dimension:
+        return stats
+    pending = []
+    for model_path in (discover_model_files(folders) if files is None else files):
+        for path in (model_path.with_suffix(".preview.png"),
+                     poster_path_for(model_path.with_suffix(".preview.mp4"))):
+            if path.exists():
+                pending.append(str(path))
+    stats["checked"] = len(pending)
+    if not pending:
+        return stats
+
+    workers = workers or get_setting("thumbnail_workers") or os.cpu_count() or 1
+    start = time.perf_counter()
+    with metrics.span("shrink_previews", files=len(pending)) as span, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        count = len(pending)
+        for result in executor.map(_shrink_preview_worker, pending, [max_dimension] * count,
+                                   [dry_run] * count, chunksize=4):
+            if result is None:
+                continue
+            stats["shrunk"] += 1
+            stats["bytes_before"] += result[0]
+            stats["bytes_after"] += result[1] if result[1] is not None else result[0]
+        span.update(stats)
+    print(f"미리보기 {format_shrink_stats(stats, dry_run)}, {time.perf_counter() - start:.1f}초 ({workers} workers)")
+    return stats
+
+# 모델 파일의 미리보기 -> (타일용 정지 이미지, 동영상 경로), 없으면 None
+# 동영상은 포스터 이미지를 쓰고, 포스터가 아직 없으면 PNG 미리보기로 대신함
+def find_preview_source(model_path):
+    model_path = Path(model_path)
+    video_path = model_path.with_suffix(".preview.mp4")
+    if not video_path.exists():
+        video_path = None
+    else:
+        poster_path = poster_path_for(video_path)
+        if poster_path.exists():
+            return poster_path, video_path
+    thumb_path = model_path.with_suffix(".preview.png")
+    if thumb_path.exists():
+        return thumb_path, video_path
+    return None, video_path
+
+# 정지 이미지(PNG/포스터)에서 타일 이미지 생성
+def render_tile_image(source, tile_size):
+    preview_img = Image.open(source)
+    preview_img.draft("RGB", (tile_size, tile_size))  # JPEG 는 디코딩 단계에서 축소
+    preview_img.thumbnail((tile_size, tile_size))
+    return round_corners(preview_img, int(tile_size * 0.1))
+
+# 타일 이미지를 캐시에 저장 (임시 파일에 쓴 뒤 바꿔치기하므로 읽는 쪽이 반쯤 쓴 파일을 보지 않음)
+def _save_cache_image(image, cache_path):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    image.save(tmp_path, format=THUMBNAIL_FORMAT, **THUMBNAIL_SAVE_OPTIONS)
+    os.replace(tmp_path, cache_path)
+
+# 캐시에 타일이 없으면 만들어서 저장 (프로세스 풀에서도 실행되므로 최상위 함수)
+def _render_tile_to_cache(source, tile_size):
+    try:
+        cache_path = thumbnail_cache_path(source, tile_size)
+        if cache_path.exists():
+            return True
+        tile = render_tile_image(source, tile_size)
+        if tile is None:
+            return False
+        _save_cache_image(tile, cache_path)
+        return True
+    except Exception as e:
+        print(f"썸네일 생성 실패: {source} ({e})")
+        return False
+
+# 타일 이미지 가져오기 (캐시 우선, 없으면 만들어서 저장)
+def get_tile_image(source, tile_size):
+    cache_path = thumbnail_cache_path(source, tile_size)
+    if cache_path.exists():
+        try:
+            tile = Image.open(cache_path)
+            tile.load()
+            metrics.count("thumbnail_cache", result="hit")
+            return tile
+        except OSError:
+            pass  # 깨진 캐시 파일은 새로 만듦
+    metrics.count("thumbnail_cache", result="miss")
+    tile = render_tile_image(source, tile_size)
+    if tile is not None:
+        try:
+            _save_cache_image(tile, cache_path)
+        except OSError as e:
+            print(f"썸네일 저장 실패: {cache_path} ({e})")
+    return tile
+
+# keep 에 없는 캐시 파일 삭제 (미리보기를 다시 받거나 줄이면 키가 바뀌어 이전 타일이 남음)
+def prune_thumbnail_cache(keep):
+    removed = 0
+    removed_bytes = 0
+    stale_tmp = time.time() - 3600  # 다른 프로세스가 쓰는 중인 임시 파일은 건너뜀
+    for dirpath, _, filenames in os.walk(THUMBNAIL_CACHE_DIR):
+        for name in filenames:
+            path = Path(dirpath) / name
+            try:
+                st = path.stat()
+                if path in keep or (".tmp" in name and st.st_mtime > stale_tmp):
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            removed += 1
+            removed_bytes += st.st_size
+    if removed:
+        print(f"썸네일 캐시 정리: {removed}개, {removed_bytes / (1024 * 1024):.1f} MB 삭제")
+    return removed
+
+# 스캔 후 캐시에 없는 타일을 프로세스 풀로 미리 만들어 둠 (쓰지 않는 타일은 지움)
+def warm_thumbnail_cache(folders, tile_size=None, workers=None, files=None):
+    tile_size = tile_size or PREVIEW_TILE_SIZE
+    workers = workers or get_setting("thumbnail_workers") or os.cpu_count() or 1
+    pending = []
+    pending_videos = []
+    referenced = set()
+    for model_path in (discover_model_files(folders) if files is None else files):
+        source, video_path = find_preview_source(model_path)
+        try:
+            if source is not None:
+                cache_path = thumbnail_cache_path(source, tile_size)
+                referenced.add(cache_path)
+                if not cache_path.exists():
+                    pending.append(str(source))
+            # 마우스를 올렸을 때 바로 재생되도록 동영상 프레임도 미리 만들어 둠
+            if video_path is not None:
+                cache_path = video_frames_cache_path(video_path, tile_size)
+                referenced.add(cache_path)
+                if not cache_path.exists():
+                    pending_videos.append(str(video_path))
+        except OSError:
+            continue
+    # 연결이 끊긴 폴더가 있으면 그 폴더의 타일을 모르므로 지우지 않음
+    if all(root.is_dir() for root in model_roots(folders)):
+        prune_thumbnail_cache(referenced)
+    if not pending and not pending_videos:
+        return 0
+
+    start = time.perf_counter()
+    created = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(_render_tile_to_cache, pending, [tile_size] * len(pending), chunksize=8):
+            created += bool(ok)
+        video_results = executor.map(_render_video_frames_to_cache, pending_videos,
+                                     [tile_size] * len(pending_videos))
+        videos_created = sum(bool(ok) for ok in video_results)
+    trim_video_frames_cache()
+    print(f"썸네일 캐시 생성: {created}/{len(pending)}개, 동영상 {videos_created}/{len(pending_videos)}개, "
+          f"{time.perf_counter() - start:.1f}초 ({workers} workers)")
+    return created
+
+class ImageCache:
+    """표시할 준비가 된 이미지(타일 CTkImage, 동영상 프레임 묶음)를 메모리 예산 안에서 보관하는 LRU.
+
+    키에 원본 파일 경로와 수정 시각, 타일 크기를 넣으므로 파일이 바뀌면 자연히 다른 항목이 되고,
+    예전 항목은 예산을 넘을 때 오래 안 쓴 순서대로 버려진다. 적중/실패 수는 stats() 와
+    성능 기록(image_cache 카운터)으로 볼 수 있다.
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb
+        self.entries = OrderedDict()  # 키 -> (값, 바이트)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @property
+    def budget(self):
+        budget_mb = get_setting("image_cache_mb") if self.budget_mb is None else self.budget_mb
+        return int(budget_mb * 1024 * 1024)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        metrics.count("image_cache", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, nbytes):
+        budget = self.budget
+        # 예산보다 큰 항목은 넣으면 다른 항목을 모두 밀어내므로 보관하지 않음
+        if nbytes > budget:
+            return value
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.entries[key] = (value, nbytes)
+            self.size += nbytes
+            while self.size > budget:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "bytes": self.size, "budget": self.budget,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+# 압축을 푼 PIL 이미지가 차지하는 메모리 (바이트)
+def image_nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+image_cache = ImageCache()
+
+class PreviewLoader:
+    """미리보기 로딩 작업 큐 (창이 떠 있는 동안 하나만 사용).
+
+    우선순위가 낮은 값부터 처리하고, 검색/배치가 바뀌면 new_generation() 으로
+    이전 세대의 작업을 디코딩 전에 버린다.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or get_setting("preview_loader_workers")
+        self.queue = PriorityQueue()
+        self.generation = 0
+        self.counter = itertools.count()
+        self.dropped = 0
+        self.threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"preview-loader-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def new_generation(self):
+        """이전 요청을 모두 무효화하고 새 세대 번호를 돌려줌"""
+        self.generation += 1
+        # 대기 중인 작업은 바로 비워서 메모리도 돌려줌 (처리 중인 작업은 결과만 버려짐)
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Exception:
+                break
+            if item[2] is None:
+                self.queue.put(item)  # 종료 신호는 남겨 둠
+                break
+            self.dropped += 1
+        return self.generation
+
+    def submit(self, priority, load, callback, is_current=None):
+        """load() 결과를 callback(result) 으로 넘김. is_current() 가 False 가 되면 건너뜀"""
+        self.queue.put((priority, next(self.counter), (self.generation, load, callback, is_current)))
+
+    def shutdown(self):
+        self.new_generation()
+        for _ in self.threads:
+            self.queue.put((float("inf"), next(self.counter), None))
+
+    def _is_stale(self, generation, is_current):
+        return generation != self.generation or (is_current is not None and not is_current())
+
+    def _worker(self):
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                return
+            generation, load, callback, is_current = job
+            if self._is_stale(generation, is_current):
+                self.dropped += 1
+                continue
+            try:
+                result = load()
+            except Exception as e:
+                print(f"미리보기 로딩 실패: {e}")
+                continue
+            if self._is_stale(generation, is_current):
+                self.dropped += 1
+                continue
+            callback(result)
+
+# 그리드 배치 계산 -> (한 줄당 개수, 전체 행 수, 칸 크기)
+def compute_grid_layout(count, container_width, tile_size=PREVIEW_TILE_SIZE, padding=GRID_PADDING):
+    cell = tile_size + 2 * padding
+    items_per_row = max(1, int(container_width // cell))
+    total_rows = (count + items_per_row - 1) // items_per_row
+    return items_per_row, total_rows, cell
+
+# 스크롤 위치에서 보이는 결과 인덱스 범위 [start, end) (위아래 margin_rows 행 포함)
+def visible_index_range(scroll_top, viewport_height, items_per_row, cell, count, margin_rows=0):
+    first_row = max(0, int(scroll_top // cell) - margin_rows)
+    last_row = int((scroll_top + viewport_height) // cell) + margin_rows
+    return min(count, first_row * items_per_row), min(count, (last_row + 1) * items_per_row)
+
+class PreviewTile:
+    """결과 그리드의 타일 하나. 스크롤하면 다른 모델에 다시 연결해서 재사용함."""
+
+    def __init__(self, canvas, size):
+        self.canvas = canvas
+        self.size = size
+        self.row = None  # (id, modelId, 모델 파일 경로, modelname)
+        self.index = None
+        self.loaded = False
+        self.video_path = None
+        self.animation_id = None
+        self.ctk_img = None
+        self.blank_img = ctk.CTkImage(Image.new("RGBA", (size, size), (0, 0, 0, 0)), size=(size, size))
+
+        # 배경색 설정
+        self.frame = ctk.CTkFrame(canvas, width=size, height=size, fg_color=("gray90", "gray20"))
+
+        # 이미지 버튼
+        self.img_btn = ctk.CTkButton(
+            self.frame,
+            image=self.blank_img,
+            text="",
+            fg_color="transparent",
+            hover_color=("gray70", "gray30"),
+            command=self._on_click
+        )
+        self.img_btn.place(relx=0.5, rely=0.5, anchor="center")
+
+        # 모델 이름 표시 (상단)
+        self.name_frame = ctk.CTkFrame(self.frame, fg_color=("gray80", "gray30"), height=30)
+        self.name_frame.place(relx=0.5, rely=0, anchor="n", relwidth=1)
+        self.name_label = ctk.CTkLabel(
+            self.name_frame,
+            text="",
+            font=("Arial", 12, "bold"),
+            text_color=("black", "white")
+        )
+        self.name_label.place(relx=0.5, rely=0.5, anchor="center")
+
+        # 동영상 아이콘
+        self.video_icon = ctk.CTkLabel(
+            self.frame,
+            text="VIDEO",
+            font=("Arial", 14, "bold"),
+            text_color="white"
+        )
+
+        # 미리보기가 없는 모델
+        self.no_preview = ctk.CTkLabel(
+            self.frame,
+            text="",
+            wraplength=size - 20,
+            justify="center",
+            font=("Arial", 12)
+        )
+
+        self.img_btn.bind("<Double-Button-1>", self._on_double_click)
+        self.no_preview.bind("<Double-Button-1>", self._on_double_click)
+        self.img_btn.bind("<Enter>", self._on_enter)
+        self.img_btn.bind("<Leave>", self._on_leave)
+
+        self.item = canvas.create_window(0, 0, window=self.frame, anchor="nw")
+
+    def bind(self, index, row, x, y):
+        """타일을 결과 하나에 연결하고 위치로 옮김. 이미지를 새로 읽어야 하면 True."""
+        self.index = index
+        self.canvas.coords(self.item, x, y)
+        self.canvas.itemconfigure(self.item, state="normal")
+        if self.row is not None and self.row[0] == row[0]:
+            self.row = row
+            # 이전 로딩 요청이 버려졌을 수 있으므로 이미지가 없으면 다시 요청
+            return not self.loaded
+
+        self.row = row
+        self.invalidate()
+        return True
+
+    def invalidate(self):
+        """빈 타일 상태로 되돌려 미리보기를 다시 읽게 함."""
+        if current_video_button is self.img_btn:
+            stop_video_playback()
+        self.loaded = False
+        self.video_path = None
+        self.ctk_img = None
+        self.img_btn.configure(image=self.blank_img)
+        self.video_icon.place_forget()
+        self.no_preview.place_forget()
+        self.img_btn.place(relx=0.5, rely=0.5, anchor="center")
+        self.name_frame.place(relx=0.5, rely=0, anchor="n", relwidth=1)
+        self._set_name(self.row[3])
+
+    def hide(self):
+        self.index = None
+        self.canvas.itemconfigure(self.item, state="hidden")
+        if current_video_button is self.img_btn:
+            stop_video_playback()
+
+    def set_preview(self, row_id, ctk_img, is_video, video_path):
+        # 로딩하는 동안 다른 모델에 연결되었으면 무시
+        if self.row is None or self.row[0] != row_id:
+            return
+        self.loaded = True
+        if ctk_img is None:
+            self._show_no_preview()
+            return
+        # ctk_img 는 image_cache 에 있는 이미지라서 같은 모델의 다른 타일과 함께 씀
+        self.ctk_img = ctk_img
+        self.img_btn.configure(image=self.ctk_img)
+        if is_video:
+            self.video_path = video_path
+            self.video_icon.place(relx=0.95, rely=0.95, anchor="se")
+
+    def _show_no_preview(self):
+        modelname = self.row[3]
+        self._stop_animation()
+        self.img_btn.place_forget()
+        self.name_frame.place_forget()
+        self.no_preview.configure(text="No Preview\n" + modelname[:20] + ("..." if len(modelname) > 20 else ""))
+        self.no_preview.place(relx=0.5, rely=0.5, anchor="center")
+
+    def _set_name(self, modelname):
+        self._stop_animation()
+        self.name_label.configure(text=modelname)
+        # 텍스트 애니메이션 설정
+        if len(modelname) > 20:
+            self._animate_text(modelname, 0)
+
+    def _animate_text(self, text, position):
+        if not self.name_label.winfo_exists():
+            return
+        position = (position + 1) % len(text)
+        self.name_label.configure(text=text[position:] + text[:position])
+        self.animation_id = self.name_label.after(200, lambda: self._animate_text(text, position))
+
+    def _stop_animation(self):
+        if self.animation_id is not None:
+            self.name_label.after_cancel(self.animation_id)
+            self.animation_id = None
+
+    def _on_click(self):
+        if self.row is not None:
+            show_details(self.row[0])
+
+    # 더블클릭 이벤트
+    def _on_double_click(self, event):
+        if self.row is not None:
+            webbrowser.open(f"https://civitai.com/models/{self.row[1]}/")
+
+    # 동영상 처리
+    def _on_enter(self, event):
+        if self.video_path is not None:
+            start_video_playback(self.video_path, self.size, self.frame, self.img_btn)
 
-def round_corners(image, radius):
-    """이미지의 모서리를 라운드 처리하는 함수"""
-    # 이미지가 RGBA 모드가 아니면 변환
-    if image.mode != 'RGBA':
-        image = image.convert('RGBA')
-    
-    # 새로운 이미지 생성
-    rounded = Image.new('RGBA', image.size, (0, 0, 0, 0))
-    
-    # 마스크 생성 (2배 크기로 생성하여 안티앨리어싱 효과 적용)
-    mask_size = (image.size[0] * 2, image.size[1] * 2)
-    mask = Image.new('L', mask_size, 0)
-    draw = ImageDraw.Draw(mask)
-    
-    # 라운드 처리된 사각형 그리기 (2배 크기로)
-    draw.rounded_rectangle([(0, 0), mask_size], radius * 2, fill=255)
-    
-    # 마스크 크기 조정 (안티앨리어싱 적용)
-    mask = mask.resize(image.size, Image.Resampling.LANCZOS)
-    
-    # 마스크를 사용하여 이미지 합성
-    rounded.paste(image, mask=mask)
-    return rounded
+    def _on_leave(self, event):
+        if self.video_path is not None:
+            stop_video_playback()
+            # 재생이 멈춘 프레임 대신 원래 타일 이미지로 되돌림
+            if self.ctk_img is not None:
+                self.img_btn.configure(image=self.ctk_img)
 
 # 전역 변수로 앱 인스턴스 관리
 app = None
@@ -199,8 +2269,10 @@ last_height = 0
 update_grid_timer = None  # update_grid 디바운스용 타이머
 
 # GUI 시작
-def launch_gui(preview_folder):
+# sync_on_start: 창과 첫 화면을 DB 내용으로 먼저 띄운 뒤 갱신 작업을 백그라운드에서 시작
+def launch_gui(model_folders, sync_on_start=False):
     global app, detail_frame, result_frame, is_resizing, resize_timer
+    load_gui_modules()
     
     is_resizing = False
     resize_timer = None
@@ -235,7 +2307,7 @@ def launch_gui(preview_folder):
     # 검색 입력창
     search_entry = ctk.CTkEntry(
         search_frame, 
-        placeholder_text="모델 이름 또는 safetensor 검색",
+        placeholder_text="모델 이름, 파일, 트리거 단어 검색 (base:SDXL tag:style type:LORA)",
         height=36,
         font=("Arial", 12)
     )
@@ -245,23 +2317,17 @@ def launch_gui(preview_folder):
     result_frame = ctk.CTkFrame(main_container, border_width=0)
     result_frame.pack(fill="both", expand=True, pady=(0, 10))
     
-    # 캔버스와 스크롤바 생성
-    canvas = ctk.CTkCanvas(result_frame)
+    # 캔버스와 스크롤바 생성 (타일은 캔버스 윈도우로 배치하고 보이는 것만 만들어 재사용)
+    canvas = ctk.CTkCanvas(result_frame, highlightthickness=0)
     canvas.configure(bg=main_container._apply_appearance_mode(main_container._fg_color))
     scrollbar = ctk.CTkScrollbar(result_frame, orientation="vertical", command=canvas.yview)
-    scrollable_frame = ctk.CTkFrame(canvas, border_width=0)
     
-    # 스크롤 가능한 프레임 구성
-    scrollable_frame.bind(
-        "<Configure>",
-        lambda e: canvas.configure(
-            scrollregion=canvas.bbox("all")
-        )
-    )
+    # 스크롤할 때마다 보이는 범위의 타일을 다시 연결
+    def on_yscroll(first, last):
+        scrollbar.set(first, last)
+        schedule_visible_refresh()
     
-    # 캔버스에 스크롤 가능한 프레임 추가
-    canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.configure(yscrollcommand=on_yscroll)
     
     # 마우스 휠 이벤트 처리
     def _on_mousewheel(event):
@@ -274,6 +2340,13 @@ def launch_gui(preview_folder):
     canvas.pack(side="left", fill="both", expand=True)
     scrollbar.pack(side="right", fill="y")
     
+    # 검색 결과 없음 표시
+    no_result = ctk.CTkLabel(
+        result_frame,
+        text="검색 결과가 없습니다.",
+        font=ctk.CTkFont(size=12, weight="bold")
+    )
+    
     # 상세 정보를 표시할 프레임 (하단 고정 높이)
     detail_frame = ctk.CTkFrame(main_container, height=200)
     detail_frame.pack(fill="x", pady=(0, 10))
@@ -314,6 +2387,160 @@ def launch_gui(preview_folder):
     # 창 크기 조절 이벤트 바인딩
     app.bind("<Configure>", on_resize)
     
+    # 가상화된 그리드 상태
+    # - bound: 현재 화면(+여유 행)에 배치된 {결과 인덱스: 타일}
+    # - free: 숨겨진 채 재사용을 기다리는 타일 (마지막으로 연결된 모델 정보를 기억)
+    preview_size = PREVIEW_TILE_SIZE
+    padding = GRID_PADDING
+    grid_state = {"items_per_row": 1, "cell": preview_size + 2 * padding, "width": 0, "height": 0}
+    bound_tiles = {}
+    free_tiles = []
+    loader = PreviewLoader()
+    refresh_pending = None
+    reset_scroll_pending = False
+    
+    # 타일 이미지 로딩 (로더 스레드에서 실행)
+    # 최근에 본 타일은 image_cache 에서 바로 가져오므로 파일을 다시 읽지 않음
+    def load_preview_image(row):
+        with metrics.span("tile_load", log=False):
+            # 미리보기 찾기 (동영상은 디코딩하지 않고 포스터 이미지만 읽음)
+            source, video_path = find_preview_source(Path(row[2]))
+            ctk_img = None
+            if source is not None:
+                try:
+                    key = ("tile", str(source), os.stat(source).st_mtime_ns, preview_size)
+                    ctk_img = image_cache.get(key)
+                    if ctk_img is None:
+                        # 이미 타일 크기로 줄이고 모서리를 둥글게 한 이미지
+                        tile_img = get_tile_image(source, preview_size)
+                        if tile_img is not None:
+                            ctk_img = ctk.CTkImage(tile_img, size=(preview_size, preview_size))
+                            # 화면에 그릴 때 만들어지는 Tk 이미지까지 대략 두 배로 잡음
+                            image_cache.put(key, ctk_img, image_nbytes(tile_img) * 2)
+                except Exception as e:
+                    print(f"Error loading preview {source}: {e}")
+            return ctk_img, video_path is not None, video_path
+    
+    def request_preview(tile, priority):
+        row = tile.row
+        
+        # GUI 업데이트는 메인 스레드에서 실행
+        def on_loaded(result):
+            if app is not None:
+                app.after(0, lambda: tile.set_preview(row[0], *result))
+        
+        # 그 사이 다른 모델에 연결된 타일이면 디코딩 전에 버림
+        loader.submit(priority, lambda: load_preview_image(row), on_loaded,
+                      is_current=lambda: tile.row is not None and tile.row[0] == row[0])
+    
+    def take_free_tile(row_id):
+        # 같은 모델에 연결되어 있던 타일이 있으면 이미지를 다시 읽지 않아도 됨
+        for i, tile in enumerate(free_tiles):
+            if tile.row is not None and tile.row[0] == row_id:
+                return free_tiles.pop(i)
+        if free_tiles:
+            return free_tiles.pop()
+        return PreviewTile(canvas, preview_size)
+    
+    def release_all_tiles():
+        for tile in bound_tiles.values():
+            tile.hide()
+            free_tiles.append(tile)
+        bound_tiles.clear()
+    
+    # 같은 자리에 같은 모델이 오는 타일은 그대로 두고 나머지만 반납
+    # (아직 이미지를 못 받은 타일도 반납해서 다시 연결될 때 새로 요청하게 함)
+    def release_changed_tiles(results):
+        for index in list(bound_tiles):
+            tile = bound_tiles[index]
+            if index < len(results) and tile.loaded and tile.row[0] == results[index][0]:
+                continue
+            del bound_tiles[index]
+            tile.hide()
+            free_tiles.append(tile)
+    
+    # 보이는 행(+여유 행)의 타일만 배치하고 나머지는 숨겨서 재사용
+    def refresh_visible():
+        nonlocal refresh_pending
+        refresh_pending = None
+        results = on_search.results
+        if not results or app is None:
+            return
+        items_per_row = grid_state["items_per_row"]
+        cell = grid_state["cell"]
+        top = canvas.canvasy(0)
+        height = canvas.winfo_height()
+        start, end = visible_index_range(top, height, items_per_row, cell, len(results),
+                                         get_setting("grid_prefetch_rows"))
+        visible_start, visible_end = visible_index_range(top, height, items_per_row, cell, len(results))
+        
+        for index in [i for i in bound_tiles if not start <= i < end]:
+            tile = bound_tiles.pop(index)
+            tile.hide()
+            free_tiles.append(tile)
+        
+        to_load = []
+        for index in range(start, end):
+            row = results[index]
+            tile = bound_tiles.get(index)
+            if tile is not None and tile.row is not None and tile.row[0] == row[0]:
+                continue
+            if tile is None:
+                tile = take_free_tile(row[0])
+                bound_tiles[index] = tile
+            x = (index % items_per_row) * cell + padding
+            y = (index // items_per_row) * cell + padding
+            if tile.bind(index, row, x, y):
+                to_load.append(tile)
+        
+        # 화면에 보이는 타일 먼저, 여유 행은 화면에서 먼 순서로
+        for tile in to_load:
+            if visible_start <= tile.index < visible_end:
+                priority = 0
+            elif tile.index < visible_start:
+                priority = (visible_start - tile.index - 1) // items_per_row + 1
+            else:
+                priority = (tile.index - visible_end) // items_per_row + 1
+            request_preview(tile, priority)
+    
+    def schedule_visible_refresh():
+        nonlocal refresh_pending
+        if refresh_pending is None and app is not None:
+            refresh_pending = app.after(10, scroll_refresh)
+    
+    # 스크롤 중 보이는 타일 다시 연결하는 데 걸린 시간
+    def scroll_refresh():
+        with metrics.span("grid_scroll", log=False):
+            refresh_visible()
+    
+    # 결과 수와 캔버스 너비로 전체 스크롤 영역과 열 수를 다시 계산
+    def layout_grid():
+        nonlocal reset_scroll_pending
+        results = on_search.results or []
+        width = max(canvas.winfo_width(), 1)
+        items_per_row, total_rows, cell = compute_grid_layout(len(results), width, preview_size, padding)
+        
+        if items_per_row != grid_state["items_per_row"]:
+            # 열 수가 바뀌면 모든 타일 위치가 바뀜
+            release_all_tiles()
+            loader.new_generation()
+        grid_state.update(items_per_row=items_per_row, cell=cell, width=width,
+                          height=canvas.winfo_height())
+        canvas.configure(scrollregion=(0, 0, width, max(total_rows * cell + padding, 1)))
+        if reset_scroll_pending:
+            # 새 검색: 자리가 바뀐 타일만 반납하고, 반납된 타일은 같은 모델 것부터 다시 가져가도록 함
+            reset_scroll_pending = False
+            release_changed_tiles(results)
+            loader.new_generation()
+            canvas.yview_moveto(0)
+        
+        if results:
+            no_result.place_forget()
+        else:
+            release_all_tiles()
+            no_result.place(relx=0.5, rely=0.5, anchor="center")
+        refresh_visible()
+    
     # update_grid 함수 정의
     def update_grid(*args):
         global update_grid_timer
@@ -327,274 +2554,85 @@ def launch_gui(preview_folder):
     
     def _update_grid():
         try:
-            print("그리드 업데이트 시작")  # 디버그 메시지
-            # 기존 위젯 제거
-            for widget in scrollable_frame.winfo_children():
-                try:
-                    widget.destroy()
-                except Exception as e:
-                    print(f"위젯 제거 중 오류 발생: {e}")
-                    continue
-            
-            if not hasattr(on_search, 'results') or not on_search.results:
-                return
-            
-            # 기본 크기 설정
-            preview_size = 180
-            padding = 5
-            
-            # 실제 컨테이너 너비 계산 (스크롤바 공간 제외)
-            # 창 크기가 1200x900으로 고정되어 있으므로, 실제 사용 가능한 너비는 1200 - 20(스크롤바) - 20(패딩)
-            container_width = 1160  # 1200 - 20 - 20
-            
-            if container_width < 1:
-                return
-            
-            # 한 줄에 들어갈 수 있는 아이템 수 계산
-            items_per_row = max(1, int(container_width // (preview_size + 2 * padding)))
-            
-            # 전체 결과 수에 대한 행 수 계산
-            total_rows = (len(on_search.results) + items_per_row - 1) // items_per_row
-            
-            # 마지막 줄의 아이템 수 계산
-            last_row_items = len(on_search.results) % items_per_row
-            if last_row_items == 0:
-                last_row_items = items_per_row
-                
-            # 마지막 줄이 프레임 밖으로 나가는지 확인
-            item_width = preview_size + 2 * padding
-            last_row_width = item_width * last_row_items
-            print(f"마지막 줄 너비: {last_row_width}, 컨테이너 너비: {container_width}")
-            print(f"아이템 크기(패딩 포함): {item_width}")
-            if last_row_width > container_width and total_rows > 1:
-                # 한 줄에 표시되는 아이템 수를 줄임
-                items_per_row = max(1, items_per_row - 1)
-                print(f"마지막 줄이 프레임을 벗어나 줄 수 조정: {items_per_row}")
-            
-            print(f"실제 컨테이너 너비: {container_width}")
-            print(f"아이템 크기(패딩 포함): {item_width}")
-            print(f"한 줄당 아이템 수: {items_per_row}")
-            
-            # 이미지 로딩을 위한 스레드 풀 생성
-            from concurrent.futures import ThreadPoolExecutor
-            executor = ThreadPoolExecutor(max_workers=4)
-            
-            def load_preview_image(idx, modelId, safetensor, modelname):
-                try:
-                    # 미리보기 파일 경로 생성
-                    safetensor_path = Path(preview_folder) / safetensor
-                    thumb_path = safetensor_path.with_suffix(".preview.png")
-                    video_path = safetensor_path.with_suffix(".preview.mp4")
-                    
-                    # 이미지/비디오 로딩
-                    preview_loaded = False
-                    preview_img = None
-                    is_video = False
-                    
-                    if video_path.exists():
-                        try:
-                            cap = cv2.VideoCapture(str(video_path))
-                            ret, frame = cap.read()
-                            if ret:
-                                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                                preview_img = Image.fromarray(frame)
-                                preview_loaded = True
-                                is_video = True
-                            cap.release()
-                        except Exception as e:
-                            print(f"Error loading video {video_path}: {e}")
-                    
-                    if not preview_loaded and thumb_path.exists():
-                        try:
-                            preview_img = Image.open(thumb_path)
-                            preview_loaded = True
-                        except Exception as e:
-                            print(f"Error loading image {thumb_path}: {e}")
-                    
-                    # GUI 업데이트는 메인 스레드에서 실행
-                    if preview_loaded:
-                        app.after(0, lambda: create_preview_widgets(idx, modelId, modelname, preview_img, is_video, video_path))
-                    else:
-                        app.after(0, lambda: create_no_preview_widget(idx, modelId, modelname))
-                    
-                except Exception as e:
-                    print(f"Error in load_preview_image: {e}")
-            
-            def create_preview_widgets(idx, modelId, modelname, preview_img, is_video, video_path):
-                try:
-                    if not scrollable_frame.winfo_exists():
-                        return
-                        
-                    # 미리보기 프레임 생성
-                    row = idx // items_per_row
-                    col = idx % items_per_row
-                    
-                    preview_frame = ctk.CTkFrame(scrollable_frame, width=preview_size, height=preview_size)
-                    preview_frame.grid(row=row, column=col, padx=padding, pady=padding, sticky="nsew")
-                    preview_frame.grid_propagate(False)
-                    
-                    # 이미지 크기 조정 (비율 유지)
-                    preview_img.thumbnail((preview_size, preview_size))
-                    radius = int(preview_size * 0.1)
-                    preview_img = round_corners(preview_img, radius)
-                    
-                    # 배경색 설정
-                    bg_color = ("gray90", "gray20")
-                    
-                    # 이미지 컨테이너
-                    container = ctk.CTkFrame(preview_frame, fg_color=bg_color)
-                    container.place(relx=0.5, rely=0.5, anchor="center", relwidth=1, relheight=1)
-                    
-                    # 이미지 버튼
-                    ctk_img = ctk.CTkImage(preview_img, size=(preview_size, preview_size))
-                    img_btn = ctk.CTkButton(
-                        container,
-                        image=ctk_img,
-                        text="",
-                        fg_color="transparent",
-                        hover_color=("gray70", "gray30"),
-                        command=lambda mid=modelId: show_details(mid)
-                    )
-                    img_btn.place(relx=0.5, rely=0.5, anchor="center")
-                    
-                    # 모델 이름 표시 (상단)
-                    name_frame = ctk.CTkFrame(container, fg_color=("gray80", "gray30"), height=30)
-                    name_frame.place(relx=0.5, rely=0, anchor="n", relwidth=1)
-                    
-                    name_label = ctk.CTkLabel(
-                        name_frame,
-                        text=modelname,
-                        font=("Arial", 12, "bold"),
-                        text_color=("black", "white")
-                    )
-                    name_label.place(relx=0.5, rely=0.5, anchor="center")
-                    
-                    # 텍스트 애니메이션 설정
-                    if len(modelname) > 20:
-                        name_label.text = modelname
-                        name_label.original_text = modelname
-                        name_label.animation_id = None
-                        name_label.position = 0
-                        
-                        def animate_text(label):
-                            if not label.winfo_exists():
-                                return
-                            label.position = (label.position + 1) % len(label.original_text)
-                            display_text = label.original_text[label.position:] + label.original_text[:label.position]
-                            label.configure(text=display_text)
-                            label.animation_id = label.after(200, lambda: animate_text(label))
-                        
-                        animate_text(name_label)
-                    
-                    # 더블클릭 이벤트
-                    def on_double_click(event, mid=modelId):
-                        url = f"https://civitai.com/models/{mid}/"
-                        webbrowser.open(url)
-                    
-                    img_btn.bind("<Double-Button-1>", on_double_click)
-                    
-                    # 동영상 처리
-                    if is_video:
-                        def on_enter(event, vpath=video_path, psize=preview_size, cont=container, btn=img_btn):
-                            start_video_playback(vpath, psize, cont, btn)
-                        
-                        def on_leave(event):
-                            stop_video_playback()
-                        
-                        img_btn.bind("<Enter>", on_enter)
-                        img_btn.bind("<Leave>", on_leave)
-                        
-                        # 동영상 아이콘
-                        icon_frame = ctk.CTkFrame(container, fg_color="transparent")
-                        icon_frame.place(relx=0.95, rely=0.95, anchor="se")
-                        
-                        video_icon = ctk.CTkLabel(
-                            icon_frame,
-                            text="VIDEO",
-                            font=("Arial", 14, "bold"),
-                            text_color="white"
-                        )
-                        video_icon.pack()
-                        
-                except Exception as e:
-                    print(f"Error creating preview widgets: {e}")
-            
-            def create_no_preview_widget(idx, modelId, modelname):
-                try:
-                    if not scrollable_frame.winfo_exists():
-                        return
-                        
-                    row = idx // items_per_row
-                    col = idx % items_per_row
-                    
-                    preview_frame = ctk.CTkFrame(scrollable_frame, width=preview_size, height=preview_size)
-                    preview_frame.grid(row=row, column=col, padx=padding, pady=padding, sticky="nsew")
-                    preview_frame.grid_propagate(False)
-                    
-                    no_preview = ctk.CTkLabel(
-                        preview_frame,
-                        text="No Preview\n" + modelname[:20] + ("..." if len(modelname) > 20 else ""),
-                        wraplength=preview_size-20,
-                        justify="center",
-                        font=("Arial", 12)
-                    )
-                    no_preview.place(relx=0.5, rely=0.5, anchor="center")
-                    
-                    def on_double_click(event, mid=modelId):
-                        url = f"https://civitai.com/models/{mid}/"
-                        webbrowser.open(url)
-                    
-                    no_preview.bind("<Double-Button-1>", on_double_click)
-                    
-                except Exception as e:
-                    print(f"Error creating no preview widget: {e}")
-            
-            # 이미지 로딩 작업 제출
-            futures = []
-            for idx, (modelId, safetensor, modelname) in enumerate(on_search.results):
-                future = executor.submit(load_preview_image, idx, modelId, safetensor, modelname)
-                futures.append(future)
-            
-            # 그리드의 열 가중치 설정
-            for i in range(items_per_row):
-                result_frame.columnconfigure(i, weight=1)
-            
-            # 작업 완료 대기 및 GUI 업데이트
-            def check_futures():
-                if all(future.done() for future in futures):
-                    executor.shutdown()
-                    return
-                
-                # 아직 완료되지 않은 작업이 있으면 계속 체크
-                app.after(100, check_futures)
-            
-            # 비동기 작업 시작
-            app.after(0, check_futures)
-            
+            with metrics.span("grid_update", results=len(on_search.results)):
+                layout_grid()
         except Exception as e:
             print(f"Error in update_grid: {e}")
     
+    # 새 검색 결과 표시 (인덱스가 같아도 모델이 다르면 타일을 다시 연결)
+    # 입력 중 검색은 이미 기다린 뒤이므로 그리드 타이머를 거치지 않고 바로 그림
+    def show_results():
+        global update_grid_timer
+        nonlocal reset_scroll_pending
+        reset_scroll_pending = True
+        if update_grid_timer:
+            app.after_cancel(update_grid_timer)
+            update_grid_timer = None
+        _update_grid()
+    
+    # 캔버스 크기가 바뀌면 열 수/보이는 범위 다시 계산
+    def on_canvas_configure(event):
+        if event.width != grid_state["width"]:
+            update_grid()
+        elif event.height != grid_state["height"]:
+            grid_state["height"] = event.height
+            schedule_visible_refresh()
+    
+    # 검색 필터 (베이스 모델, 정렬)
+    all_base_models = "모든 베이스 모델"
+    sort_labels = {"관련도순": "relevance", "이름순": "name", "최근 추가순": "newest",
+                   "최근 공개순": "created", "크기순": "size"}
+    base_model_menu = ctk.CTkOptionMenu(
+        search_frame,
+        values=[all_base_models],
+        width=150,
+        height=36,
+        command=lambda _: on_search()
+    )
+    sort_menu = ctk.CTkOptionMenu(
+        search_frame,
+        values=list(sort_labels),
+        width=110,
+        height=36,
+        command=lambda _: on_search()
+    )
+
+    def update_filter_options():
+        base_model_menu.configure(values=[all_base_models] + get_filter_values()["baseModel"])
+
+    # 검색창 입력 + 선택 상자 값으로 검색 (검색창에서 base:, type:, tag: 구문도 사용 가능)
+    search_index = ModelSearchIndex()
+    sync_lock = threading.Lock()  # 갱신 버튼과 폴더 감시가 동시에 처리하지 않도록
+
+    def run_search(text):
+        keyword, filters = parse_search_query(text)
+        if base_model_menu.get() != all_base_models:
+            filters.setdefault("base_model", base_model_menu.get())
+        return search_index.search(keyword, sort=sort_labels[sort_menu.get()], **filters)
+
     # 검색 함수 정의
     def on_search():
+        nonlocal search_timer
+        search_timer = None
         keyword = search_entry.get()
-        on_search.results = search_models(keyword)
-        
-        # 검색 결과가 없을 때 처리
-        if not on_search.results:
-            # 기존 위젯 제거
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-                
-            no_result = ctk.CTkLabel(
-                scrollable_frame, 
-                text="검색 결과가 없습니다.", 
-                font=ctk.CTkFont(size=12, weight="bold")
-            )
-            no_result.place(relx=0.5, rely=0.5, anchor="center")
+        query = (keyword, base_model_menu.get(), sort_menu.get())
+        # 방향키 등으로 검색 조건이 그대로면 다시 그리지 않음
+        if query == on_search.query:
             return
-        
-        # 검색 결과가 있으면 그리드 업데이트
-        update_grid()
+        on_search.query = query
+        with metrics.span("search", query=keyword) as span:
+            on_search.results = run_search(keyword)
+            span["results"] = len(on_search.results)
+        show_results()
+    
+    # 입력할 때마다 검색 (입력을 잠시 멈췄을 때 한 번만 실행)
+    search_timer = None
+    
+    def on_key_release(event):
+        nonlocal search_timer
+        if search_timer is not None:
+            app.after_cancel(search_timer)
+        search_timer = app.after(get_setting("search_debounce_ms"), on_search)
     
     # 검색 버튼
     search_btn = ctk.CTkButton(
@@ -607,36 +2645,49 @@ def launch_gui(preview_folder):
     )
     search_btn.pack(side="right", padx=(5, 0))
     
-    # 갱신 버튼
+    # 갱신 버튼 (작업은 백그라운드에서 실행하고, 실행 중에 누르면 취소)
+    refresh_job = None
+    
     def refresh_data():
-        # 기존 검색 결과 저장
-        current_keyword = search_entry.get()
-        
-        # DB 갱신
-        scan_and_update_db(preview_folder)
-        process_safetensors_files(preview_folder)
-        
-        # 검색 결과 업데이트 및 화면 갱신
-        on_search.results = search_models(current_keyword)
-        
-        # 기존 위젯 제거
-        for widget in scrollable_frame.winfo_children():
-            widget.destroy()
-            
-        # 검색 결과가 없을 때 처리
-        if not on_search.results:
-            no_result = ctk.CTkLabel(
-                scrollable_frame, 
-                text="검색 결과가 없습니다.", 
-                font=ctk.CTkFont(size=12, weight="bold")
-            )
-            no_result.place(relx=0.5, rely=0.5, anchor="center")
-        else:
-            # 검색 결과가 있으면 그리드 업데이트
-            update_grid()
+        nonlocal refresh_job
+        if refresh_job is not None and refresh_job.is_running():
+            refresh_job.cancel()
+            refresh_btn.configure(text="취소 중...")
+            return
+        refresh_job = RefreshJob(model_folders, lock=sync_lock)
+        refresh_job.start()
+        refresh_btn.configure(text="취소")
+        status_label.configure(text="갱신 준비 중...")
+        app.after(200, poll_refresh_job)
+    
+    # 진행 상황을 표시하고, 저장이 끝난 모델은 바로 그리드에 추가
+    def poll_refresh_job():
+        job = refresh_job
+        if app is None or job is None:
+            return
+        finished = None
+        stats = None
+        models = set()
+        while not job.events.empty():
+            kind, value = job.events.get_nowait()
+            if kind == "progress":
+                stats = value
+            elif kind == "model":
+                models.add(value)
+            elif kind == "done":
+                finished = value
+        if models:
+            schedule_model_changes(models)
+        if stats is not None:
+            status_label.configure(text=format_refresh_progress(stats, job.eta(stats)))
+        if finished is None:
+            app.after(200, poll_refresh_job)
+            return
         
-        # 갱신 완료 메시지
-        refresh_btn.configure(text="갱신 완료!")
+        # 썸네일 생성까지 끝났고 처음 DB 동기화로 바뀐 모델도 있으므로 전체 결과 다시 반영
+        reload_all_models()
+        status_label.configure(text="")
+        refresh_btn.configure(text="갱신 취소됨" if finished else "갱신 완료!")
         app.after(2000, lambda: refresh_btn.configure(text="갱신"))
 
     refresh_btn = ctk.CTkButton(
@@ -648,22 +2699,135 @@ def launch_gui(preview_folder):
         command=refresh_data
     )
     refresh_btn.pack(side="right", padx=(5, 0))
+    sort_menu.pack(side="right", padx=(5, 0))
+    base_model_menu.pack(side="right", padx=(5, 0))
+    status_label = ctk.CTkLabel(search_frame, text="", font=("Arial", 11))
+    status_label.pack(side="right", padx=(5, 0))
+    update_filter_options()
     
     # 검색창 엔터 이벤트 바인딩
     def on_enter(event):
         on_search()
     search_entry.bind("<Return>", on_enter)
+    search_entry.bind("<KeyRelease>", on_key_release)
     
     # 윈도우 크기 변경 이벤트 바인딩
-    result_frame.bind("<Configure>", update_grid)
+    canvas.bind("<Configure>", on_canvas_configure)
     
     # 초기 검색 실행
     on_search.results = []
+    on_search.query = None
     on_search()  # 초기 검색 실행
     
+    # 포스터가 없던 기존 동영상 미리보기는 백그라운드에서 포스터를 만든 뒤 다시 읽음
+    def reload_missing_previews():
+        for tile in free_tiles:
+            if tile.row is not None and tile.ctk_img is None:
+                tile.loaded = False
+        for tile in bound_tiles.values():
+            if tile.ctk_img is None:
+                tile.invalidate()
+                request_preview(tile, 0)
+    
+    def backfill_posters_job():
+        if backfill_video_posters(model_folders) and app is not None:
+            app.after(0, reload_missing_previews)
+    
+    threading.Thread(target=backfill_posters_job, daemon=True).start()
+    
+    # 첫 화면 타일을 먼저 읽을 수 있도록 조금 뒤에 갱신 작업 시작
+    if sync_on_start:
+        app.after(500, refresh_data)
+    
+    # 폴더 감시: 바뀐 모델만 처리한 뒤, 스크롤 위치를 유지한 채 바뀐 타일만 다시 그림
+    def apply_model_changes(model_paths):
+        # 검색 색인은 바뀐 모델만 다시 읽음 (전체를 다시 읽으면 큰 라이브러리에서 창이 멈춤)
+        search_index.update(model_paths)
+        on_search.results = run_search(search_entry.get())
+        for tile in free_tiles:
+            if tile.row is not None and tile.row[2] in model_paths:
+                tile.loaded = False
+        for tile in bound_tiles.values():
+            if tile.row is not None and tile.row[2] in model_paths:
+                tile.invalidate()
+                request_preview(tile, 0)
+        update_filter_options()
+        update_grid()
+    
+    # 갱신 중에는 모델이 계속 저장되므로 바뀐 모델을 모아서 1초에 한 번만 다시 그림
+    pending_model_changes = set()
+    model_changes_job = None
+    
+    def flush_model_changes():
+        nonlocal model_changes_job
+        model_changes_job = None
+        model_paths = set(pending_model_changes)
+        pending_model_changes.clear()
+        apply_model_changes(model_paths)
+    
+    def schedule_model_changes(model_paths):
+        nonlocal model_changes_job
+        pending_model_changes.update(model_paths)
+        if model_changes_job is None:
+            model_changes_job = app.after(1000, flush_model_changes)
+    
+    # 전체 다시 읽기는 백그라운드에서 하고 다 읽으면 화면에 반영
+    def reload_all_models():
+        def work():
+            search_index.reload()
+            if app is not None:
+                app.after(0, lambda: apply_model_changes(set()))
+        threading.Thread(target=work, daemon=True).start()
+    
+    def on_folder_change(model_paths):
+        with sync_lock:
+            sync_model_changes(model_folders, model_paths)
+        if app is not None:
+            app.after(0, lambda: schedule_model_changes(model_paths))
+    
+    watcher = None
+    if get_setting("watch_interval_sec") > 0:
+        watcher = FolderWatcher(model_folders, on_folder_change)
+        watcher.start()
+    
+    # 디버그 창: F12 로 켜고 끄는 성능 수치 표시 (1초마다 갱신)
+    debug_overlay = ctk.CTkLabel(app, text="", font=("Consolas", 11), justify="left", anchor="nw",
+                                 fg_color=("gray85", "gray15"), corner_radius=6)
+    debug_overlay_job = None
+    
+    def update_debug_overlay():
+        nonlocal debug_overlay_job
+        cache = image_cache.stats()
+        lines = [f"타일: 표시 {len(bound_tiles)}개, 대기 {len(free_tiles)}개, "
+                 f"로딩 대기열 {loader.queue.qsize()}개, 버린 요청 {loader.dropped}개",
+                 f"이미지 캐시: {cache['entries']}개, {cache['bytes'] / (1024 * 1024):.1f}/"
+                 f"{cache['budget'] / (1024 * 1024):.0f} MB, 적중률 {cache['hit_rate']:.0%}, "
+                 f"버림 {cache['evictions']}개"]
+        debug_overlay.configure(text="\n".join(lines + metrics.summary_lines()))
+        debug_overlay.lift()
+        debug_overlay_job = app.after(1000, update_debug_overlay)
+    
+    def toggle_debug_overlay(event=None):
+        nonlocal debug_overlay_job
+        if debug_overlay_job is None:
+            debug_overlay.place(relx=1.0, rely=1.0, x=-10, y=-10, anchor="se")
+            update_debug_overlay()
+        else:
+            app.after_cancel(debug_overlay_job)
+            debug_overlay_job = None
+            debug_overlay.place_forget()
+    
+    app.bind("<F12>", toggle_debug_overlay)
+    if get_setting("debug_overlay"):
+        toggle_debug_overlay()
+    
     # 메인 루프 시작
     try:
         app.mainloop()
+        loader.shutdown()
+        if watcher is not None:
+            watcher.stop()
+        metrics.write_prometheus()
     except KeyboardInterrupt:
         if app is not None:
             app.destroy()
@@ -672,7 +2836,7 @@ def launch_gui(preview_folder):
         if app is not None:
             app.destroy()
 
-def show_details(modelId):
+def show_details(row_id):
     global app
     if not app:
         return
@@ -682,116 +2846,512 @@ def show_details(modelId):
         widget.destroy()
     
     # DB에서 모델 정보 조회
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT * FROM models WHERE modelId = ?", (modelId,))
-    row = c.fetchone()
-    conn.close()
+    row = db_read().execute(f"SELECT {', '.join(MODEL_COLUMNS)} FROM models WHERE id = ?", (row_id,)).fetchone()
     
     if row:
+        row = dict(zip(MODEL_COLUMNS, row))
         # 상세 정보 표시
         detail_text = ctk.CTkTextbox(detail_frame, wrap="word", height=200)
         detail_text.pack(fill="both", expand=True, padx=10, pady=10)
         
         # 모델 정보 포맷팅
-        model_info = f"Model ID: {row[0]}\n"
-        model_info += f"File: {row[1]}\n"
-        model_info += f"Name: {row[2]}\n"
+        model_info = f"Model ID: {row['modelId']} (Version ID: {row['versionId']})\n"
+        model_info += f"File: {row['path']}\n"
+        model_info += f"Name: {row['modelname']}"
+        model_info += f" - {row['versionName']}\n" if row['versionName'] else "\n"
+        model_info += f"Base Model: {row['baseModel'] or '-'} / Type: {row['modelType'] or '-'}\n"
+        if row['fileSize']:
+            model_info += f"Size: {row['fileSize'] / (1024 * 1024):.1f} MB\n"
+        if row['createdAt']:
+            model_info += f"Created: {row['createdAt'][:10]}\n"
+        if row['tags']:
+            model_info += f"Tags: {row['tags']}\n"
         
         # trainedWords 처리 (eval 대신 안전한 파싱 사용)
-        if row[3]:  # trainedWords가 있는 경우
+        if row['trainedWords']:  # trainedWords가 있는 경우
             try:
                 # 먼저 JSON 형식으로 파싱 시도
-                import json
-                trained_words = json.loads(row[3])
+                trained_words = json.loads(row['trainedWords'])
                 if isinstance(trained_words, list):
                     model_info += f"Trained Words: {', '.join(trained_words) if trained_words else 'None'}\n"
                 else:
                     model_info += f"Trained Words: {trained_words}\n"
             except json.JSONDecodeError:
                 # JSON 파싱 실패 시 그대로 표시
-                model_info += f"Trained Words: {row[3]}\n"
+                model_info += f"Trained Words: {row['trainedWords']}\n"
         else:
             model_info += "Trained Words: None\n"
         
         detail_text.insert("1.0", model_info)
         detail_text.configure(state="disabled")  # 편집 불가능하도록 설정
 
-# JSON 파싱 후 DB 저장 루틴
-def scan_and_update_db(folder):
+# JSON 파싱 후 DB 저장 루틴 (바뀐 JSON 만 다시 읽고 한 트랜잭션으로 반영)
+# model_paths 를 주면 폴더 전체 대신 그 모델 파일들만 동기화
+# discovered 는 이미 찾아 둔 전체 모델 파일 목록 (주면 폴더를 다시 훑지 않음)
+# 연결되지 않은 모델 폴더(NAS 등)에 있던 모델은 지우지 않음
+def scan_and_update_db(folders, model_paths=None, discovered=None):
     init_db()
-    for json_path in Path(folder).glob("*.civitai.info.json"):
-        with open(json_path, encoding="utf-8") as f:
-            data = json.load(f)
-        modelId = data.get("modelId")
-        modelname = data.get("model", {}).get("name", "")
-        trainedWords = data.get("trainedWords", [])
-        safetensor_file = json_path.name.replace(".civitai.info.json", ".safetensors")
-        if modelId:
-            insert_model_data(modelId, safetensor_file, modelname, trainedWords)
+    start = time.perf_counter()
+    roots = model_roots(folders)
+    # 지우는 것은 지금 읽을 수 있는 폴더 아래의 모델뿐
+    # (연결이 끊긴 폴더나 이번에 넘기지 않은 폴더의 모델은 그대로 둠)
+    online = [str(root) for root in roots if root.is_dir()]
+    if model_paths is None:
+        model_files = discovered if discovered is not None else discover_model_files(roots)
+    else:
+        model_paths = {str(path) for path in model_paths}
+        model_files = [Path(path) for path in model_paths if os.path.exists(path)]
+
+    # 현재 JSON 파일 목록 (모델 파일이 지워진 JSON 은 없는 것으로 취급)
+    current = {}
+    for model_path in model_files:
+        json_path = model_path.with_suffix(".civitai.info.json")
+        try:
+            st = json_path.stat()
+        except OSError:
+            continue
+        current[str(json_path)] = (json_path, model_path, st.st_mtime_ns, st.st_size)
+
+    # 일부 모델만 동기화할 때는 그 모델의 행만 읽음 (라이브러리가 커도 바뀐 모델 수만큼만 걸림)
+    if model_paths is None:
+        known_rows = db_read().execute("SELECT path, mtime_ns, size FROM info_files")
+        db_models = [path for (path,) in db_read().execute("SELECT path FROM models")]
+    else:
+        known_rows = _select_in("SELECT path, mtime_ns, size FROM info_files WHERE model_path IN ({})", model_paths)
+        db_models = [path for (path,) in _select_in("SELECT path FROM models WHERE path IN ({})", model_paths)]
+    known = {row[0]: row[1:3] for row in known_rows}
+
+    model_rows = []
+    info_rows = []
+    invalid = []
+    for path, (json_path, model_path, mtime_ns, size) in current.items():
+        if known.get(path) == (mtime_ns, size):
+            continue
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+            model_st = model_path.stat()
+            row = _model_row_from_info(data, model_path, model_st, get_cached_sha256(model_path, model_st))
+            if row["versionId"]:
+                model_rows.append(row)
+            else:
+                invalid.append((str(model_path),))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"JSON 파싱 실패: {json_path.name} ({e})")
+            invalid.append((str(model_path),))
+        # 파싱에 실패한 파일도 기록해서 내용이 바뀔 때까지 다시 읽지 않음
+        info_rows.append((path, mtime_ns, size, str(model_path)))
+
+    removed = [path for path in known if path not in current and _is_under(path, online)]
+    live_files = {str(model_path) for _, model_path, _, _ in current.values()}
+    stale_models = [(path,) for path in db_models if path not in live_files and _is_under(path, online)]
+
+    changed_rows = len(model_rows) + len(info_rows) + len(removed) + len(stale_models) + len(invalid)
+    with metrics.span("db_sync_write", rows=changed_rows), db_write() as conn:
+        c = conn.cursor()
+        _upsert_models(c, model_rows)
+        c.executemany("REPLACE INTO info_files (path, mtime_ns, size, model_path) VALUES (?, ?, ?, ?)",
+                      info_rows)
+        c.executemany("DELETE FROM info_files WHERE path = ?", [(path,) for path in removed])
+        c.executemany("DELETE FROM models WHERE path = ?", stale_models + invalid)
+
+    result = {"models": len(current), "updated": len(model_rows), "removed": len(stale_models) + len(invalid)}
+    metrics.observe("db_sync", time.perf_counter() - start, json_read=len(info_rows), **result)
+    metrics.count("db_rows_changed", changed_rows)
+    if model_rows or removed or stale_models or invalid:
+        print(f"DB 동기화: {len(model_rows)}개 갱신, {len(stale_models) + len(invalid)}개 삭제 "
+              f"(JSON {len(current)}개 중 {len(info_rows)}개 읽음)")
+    return result
+
+# 바뀐 모델 파일만 해시/조회/DB 동기화 (폴더 감시용)
+def sync_model_changes(folders, model_paths):
+    model_paths = {str(path) for path in model_paths}
+    with metrics.span("folder_sync", models=len(model_paths)):
+        files = sorted(Path(path) for path in model_paths if os.path.exists(path))
+        if files:
+            process_safetensors_files(folders, files=files)
+        # 다른 곳에서 복사해 온 동영상 미리보기는 포스터가 없을 수 있음
+        for file in files:
+            video_path = file.with_suffix(".preview.mp4")
+            if video_path.exists() and not poster_path_for(video_path).exists():
+                extract_poster_frame(video_path)
+        scan_and_update_db(folders, model_paths)
+
+class FolderWatcher:
+    """모델 폴더들을 주기적으로 훑어서 바뀐 모델만 알려 주는 감시 스레드.
+
+    폴더는 walk_directories 로 병렬로 읽고, 수정 시각이 그대로인 폴더는 목록을 다시
+    읽지 않고 파일 정보만 새로 읽는다 (쓰는 중인 파일이 있던 폴더는 목록도 다시 읽음).
+    파일 크기/수정 시각이 두 번 연속 같게 보일 때만 알리므로, 복사 중인 파일은 복사가
+    끝난 뒤 한 번만 처리된다.
+    on_change 는 감시 스레드에서 바뀐 모델 파일 경로 집합과 함께 호출된다.
+    """
+
+    # 모델 파일 옆에 생기는 파일 -> 모델 파일로 묶음
+    SIDECAR_SUFFIXES = (".civitai.info.json", ".preview.poster.png", ".preview.png", ".preview.mp4")
+
+    def __init__(self, folders, on_change, interval=None):
+        self.roots = model_roots(folders)
+        self.model_suffixes = tuple(ext.lower() for ext in get_setting("model_extensions"))
+        self.exclude = tuple(get_setting("exclude_patterns"))
+        self.on_change = on_change
+        self.interval = interval or get_setting("watch_interval_sec")
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.listings = {}
+        self.unsettled = set()  # 아직 쓰는 중인 파일이 있는 폴더
+        self.previous = {}
+        self.reported = {}
+
+    # {파일 경로: (size, mtime_ns)}
+    def snapshot(self):
+        # 연결이 끊긴 폴더는 건너뜀 (그 안의 모델은 scan_and_update_db 가 지우지 않음)
+        roots = [root for root in self.roots if root.is_dir()]
+        self.listings = walk_directories(roots, self.model_suffixes + self.SIDECAR_SUFFIXES, self.exclude,
+                                         self.listings, with_stat=True, rescan=self.unsettled)
+        return {
+            os.path.join(path, name): state
+            for path, (_, files, _) in self.listings.items() for name, state in files.items()
+        }
+
+    # 파일 경로 -> 그 파일이 속한 모델 파일 경로
+    def model_path(self, file_path, models_by_stem):
+        if file_path.lower().endswith(self.model_suffixes):
+            return file_path
+        for suffix in self.SIDECAR_SUFFIXES:
+            if file_path.endswith(suffix):
+                stem = file_path[:-len(suffix)]
+                return models_by_stem.get(stem, stem + ".safetensors")
+        return file_path
+
+    # 이전 스냅샷과 비교해서 바뀐 모델 파일 경로 집합 반환
+    def poll(self):
+        current = self.snapshot()
+        changed = set()
+        for path in set(current) | set(self.previous) | set(self.reported):
+            state = current.get(path)
+            # 아직 쓰는 중이면 다음 번에 다시 봄
+            if state != self.previous.get(path) or state == self.reported.get(path):
+                continue
+            if state is None:
+                del self.reported[path]
+            else:
+                self.reported[path] = state
+            changed.add(path)
+        models_by_stem = {
+            os.path.splitext(path)[0]: path for path in itertools.chain(current, self.previous)
+            if path.lower().endswith(self.model_suffixes)
+        }
+        self.unsettled = {os.path.dirname(path) for path, state in current.items() if state != self.reported.get(path)}
+        self.previous = current
+        return {self.model_path(path, models_by_stem) for path in changed}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        # 시작할 때의 폴더 상태는 이미 동기화된 것으로 봄
+        # (폴더 전체를 훑으므로 창이 늦게 뜨지 않도록 GUI 스레드가 아닌 감시 스레드에서 읽음)
+        self.previous = self.snapshot()
+        self.reported = dict(self.previous)
+        while not self.stop_event.wait(self.interval):
+            changed = self.poll()
+            if not changed:
+                continue
+            print(f"폴더 변경 감지: 모델 {len(changed)}개")
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                print(f"변경된 모델 처리 중 오류 발생: {e}")
+
+# 갱신 진행 상황 문구 (예: "해시 12/40 (1.2/3.4 GB) · 조회 10 · 다운로드 8개 35.2 MB · 남은 시간 1분 20초")
+def format_refresh_progress(stats, eta=None):
+    parts = [
+        f"해시 {stats['hashed']}/{stats['total']} "
+        f"({stats['hashed_bytes'] / (1024 ** 3):.1f}/{stats['total_bytes'] / (1024 ** 3):.1f} GB)",
+        f"조회 {stats['fetched']}",
+        f"다운로드 {stats['downloaded']}개 {stats['downloaded_bytes'] / (1024 * 1024):.1f} MB",
+    ]
+    if stats.get("failed"):
+        parts.append(f"조회 실패 {stats['failed']}")
+    if eta is not None:
+        minutes, seconds = divmod(int(eta), 60)
+        parts.append(f"남은 시간 {minutes}분 {seconds}초" if minutes else f"남은 시간 {seconds}초")
+    return " · ".join(parts)
+
+class RefreshJob:
+    """갱신 작업(DB 동기화 -> 해시/조회/다운로드 -> 썸네일)을 백그라운드 스레드에서 실행.
+
+    진행 상황은 events 큐에 ("progress", 통계), ("model", 모델 파일 경로),
+    ("done", 취소 여부) 로 쌓이고 GUI 가 app.after 로 꺼내 간다.
+    모델 하나가 저장될 때마다 그 모델만 DB 에 반영하므로 결과가 바로 보인다.
+    """
+
+    def __init__(self, folders, lock=None):
+        self.folders = model_roots(folders)
+        self.lock = lock or threading.Lock()
+        self.events = Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.stats_lock = threading.Lock()
+        self.stats = {"total": 0, "total_bytes": 0, "hashed": 0, "hashed_bytes": 0,
+                      "fetched": 0, "failed": 0, "done": 0, "downloaded": 0, "downloaded_bytes": 0}
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # 끝난 모델 수 기준 남은 시간 (초), 아직 알 수 없으면 None
+    def eta(self, stats):
+        if not stats["done"] or not stats["total"]:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed / stats["done"] * (stats["total"] - stats["done"])
+
+    def _progress(self, stage, **info):
+        with self.stats_lock:
+            stats = self.stats
+            if stage == "start":
+                stats["total"] = info["total"]
+                stats["total_bytes"] = info["total_bytes"]
+            elif stage == "hashed":
+                stats["hashed"] += 1
+                stats["hashed_bytes"] += info["size"]
+            elif stage == "fetched":
+                stats["fetched"] += info["count"]
+            elif stage == "saved":
+                stats["done"] += 1
+                if info["status"] not in (None, "not_found"):
+                    stats["failed"] += 1
+                if info["size"]:
+                    stats["downloaded"] += 1
+                    stats["downloaded_bytes"] += info["size"]
+            snapshot = dict(stats)
+        if stage == "saved" and info["found"]:
+            scan_and_update_db(self.folders, {str(info["file"])})
+            self.events.put(("model", str(info["file"])))
+        self.events.put(("progress", snapshot))
+
+    def _run(self):
+        try:
+            with self.lock, metrics.span("refresh") as span:
+                # 폴더는 한 번만 훑고 모든 단계가 같은 파일 목록을 씀
+                files = discover_model_files(self.folders)
+                scan_and_update_db(self.folders, discovered=files)
+                with metrics.span("fetch_all"):
+                    process_safetensors_files(self.folders, files=files, progress=self._progress,
+                                              cancel_event=self.cancel_event)
+                if not self.cancel_event.is_set():
+                    with metrics.span("thumbnails"):
+                        warm_thumbnail_cache(self.folders, files=files)
+                with self.stats_lock:
+                    span.update(self.stats, cancelled=self.cancel_event.is_set())
+        except Exception as e:
+            print(f"갱신 중 오류 발생: {e}")
+        finally:
+            metrics.write_prometheus()
+            self.events.put(("done", self.cancel_event.is_set()))
+
+# 동영상 미리보기 프레임 캐시
+# 동영상을 한 번만 디코딩해서 타일 크기의 RGBA 프레임 묶음으로 만들어 두고
+# 디스크(.npz)와 메모리(image_cache, 타일 이미지와 같은 예산)에 보관함
+
+def video_frames_cache_path(video_path, tile_size, st=None):
+    thumb_path = thumbnail_cache_path(video_path, tile_size, st)
+    return thumb_path.with_name(thumb_path.stem + "_frames.jpg")
+
+# 디스크 캐시 형식: RGB 프레임을 세로로 이어 붙인 JPEG 한 장 (주석에 fps/프레임 수)
+# 모서리 알파는 모든 프레임이 같으므로 저장하지 않고 읽을 때 붙임
+VIDEO_FRAMES_JPEG_QUALITY = 85
+JPEG_MAX_DIMENSION = 65500
+
+# 동영상을 디코딩해서 (RGB 프레임 배열 [N, h, w, 3], fps) 반환
+def decode_video_frames(video_path, tile_size, max_frames=None):
+    max_frames = max_frames or get_setting("video_preview_max_frames")
+    load_video_modules()
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        if not cap.isOpened():
+            return None, 0
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = fps if fps and fps > 0 else 30.0
+        frames = []
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # 색 변환 전에 먼저 줄여서 변환할 픽셀 수를 줄임
+            h, w = frame.shape[:2]
+            scale = min(tile_size / w, tile_size / h, 1.0)
+            if scale < 1.0:
+                frame = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            # 세로로 이어 붙인 JPEG 의 최대 높이를 넘지 않게 함
+            if (len(frames) + 1) * frame.shape[0] > JPEG_MAX_DIMENSION:
+                break
+    finally:
+        cap.release()
+    if not frames:
+        return None, 0
+    return np.stack(frames), fps
+
+def _read_video_frames_strip(cache_path):
+    with Image.open(cache_path) as strip:
+        info = json.loads(strip.info["comment"])
+        rgb = np.asarray(strip.convert("RGB"))
+    count = int(info["frames"])
+    return rgb.reshape(count, rgb.shape[0] // count, rgb.shape[1], 3), float(info["fps"])
+
+def _write_video_frames_strip(cache_path, frames, fps):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    strip = Image.fromarray(frames.reshape(-1, frames.shape[2], 3))
+    comment = json.dumps({"fps": fps, "frames": len(frames)})
+    strip.save(tmp_path, format="JPEG", quality=VIDEO_FRAMES_JPEG_QUALITY, comment=comment)
+    os.replace(tmp_path, cache_path)
+
+# 디스크 캐시에서 프레임 묶음을 읽고, 없으면 디코딩해서 저장 -> (RGBA 프레임 배열, fps)
+def _load_video_frames_file(video_path, tile_size, cache_path):
+    load_video_modules()
+    frames = None
+    if cache_path.exists():
+        try:
+            frames, fps = _read_video_frames_strip(cache_path)
+            os.utime(cache_path)  # 캐시 크기를 줄일 때 최근에 쓴 것을 남기도록 표시
+        except (OSError, ValueError, KeyError):
+            frames = None  # 깨진 캐시 파일은 새로 만듦
+    if frames is None:
+        frames, fps = decode_video_frames(video_path, tile_size)
+        if frames is None:
+            return None, 0
+        try:
+            _write_video_frames_strip(cache_path, frames, fps)
+        except OSError as e:
+            print(f"동영상 프레임 캐시 저장 실패: {cache_path} ({e})")
+    count, height, width, _ = frames.shape
+    rgba = np.empty((count, height, width, 4), np.uint8)
+    rgba[..., :3] = frames
+    rgba[..., 3] = rounded_corner_alpha(width, height, int(tile_size * 0.1))
+    return rgba, fps
+
+# 동영상 프레임 캐시가 max_mb 를 넘으면 가장 오래 쓰지 않은 것부터 지움
+def trim_video_frames_cache(max_mb=None):
+    max_bytes = (max_mb if max_mb is not None else get_setting("video_frames_cache_mb")) * 1024 * 1024
+    entries = []
+    for path in Path(THUMBNAIL_CACHE_DIR).glob("*/*_frames.jpg"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        print(f"동영상 프레임 캐시 정리: {removed}개 삭제 ({total / (1024 * 1024):.1f} MB 남음)")
+    return removed
+
+# 프레임 묶음 가져오기 (메모리 -> 디스크 캐시 -> 디코딩 순)
+def load_video_frames(video_path, tile_size):
+    st = os.stat(video_path)
+    key = ("video_frames", str(video_path), st.st_mtime_ns, tile_size)
+    cached = image_cache.get(key)
+    if cached is not None:
+        return cached
+
+    frames, fps = _load_video_frames_file(video_path, tile_size, video_frames_cache_path(video_path, tile_size, st))
+    if frames is None:
+        return None, 0
+    return image_cache.put(key, (frames, fps), frames.nbytes)
+
+# 캐시에 프레임 묶음이 없으면 만들어 둠 (프로세스 풀에서도 실행되므로 최상위 함수)
+def _render_video_frames_to_cache(source, tile_size):
+    try:
+        cache_path = video_frames_cache_path(source, tile_size)
+        if cache_path.exists():
+            return True
+        frames, fps = decode_video_frames(source, tile_size)
+        if frames is None:
+            return False
+        _write_video_frames_strip(cache_path, frames, fps)
+        return True
+    except Exception as e:
+        print(f"동영상 프레임 캐시 생성 실패: {source} ({e})")
+        return False
 
 # 동영상 재생 스레드 함수
 def video_playback_thread(video_path, preview_size, container, img_btn):
     global video_stop_event, current_video_image, current_video_button
     
     try:
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
+        frames, fps = load_video_frames(video_path, preview_size)
+        if frames is None:
             print(f"Error: Could not open video file {video_path}")
             return
-            
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_delay = 1.0 / fps if fps > 0 else 1.0 / 30.0
-        
-        # 첫 프레임을 미리 로드
-        ret, frame = cap.read()
-        if not ret:
-            return
-            
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        preview_img = Image.fromarray(frame)
-        preview_img.thumbnail((preview_size, preview_size))
-        preview_img = round_corners(preview_img, int(preview_size * 0.1))
         
-        # 초기 이미지 설정
-        current_video_image = ctk.CTkImage(preview_img, size=(preview_size, preview_size))
-        img_btn.configure(image=current_video_image)
-        current_video_button = img_btn
+        # 프레임마다 CTkImage 를 새로 만들지 않고 하나를 재사용
+        images = [Image.fromarray(frame) for frame in frames]
+        ctk_image = ctk.CTkImage(images[0], size=(preview_size, preview_size))
+        if not video_stop_event.is_set():
+            img_btn.after(0, lambda: update_video_frame(img_btn, ctk_image, None))
         
+        # 디코딩/그리기 시간과 상관없이 원래 속도로 재생되도록 다음 프레임 시각 기준으로 대기
+        frame_delay = 1.0 / fps
+        index = 0
+        deadline = time.perf_counter()
         while not video_stop_event.is_set():
-            ret, frame = cap.read()
-            if not ret:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                continue
-                
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            preview_img = Image.fromarray(frame)
-            preview_img.thumbnail((preview_size, preview_size))
-            preview_img = round_corners(preview_img, int(preview_size * 0.1))
-            
-            # 새로운 이미지 생성
-            new_image = ctk.CTkImage(preview_img, size=(preview_size, preview_size))
+            deadline += frame_delay
+            wait = deadline - time.perf_counter()
+            if wait > 0:
+                if video_stop_event.wait(wait):
+                    break
+            elif wait < -frame_delay:
+                # 많이 밀렸으면 프레임을 건너뛰어 따라잡음
+                skipped = int(-wait / frame_delay)
+                index += skipped
+                deadline += skipped * frame_delay
+            index = (index + 1) % len(images)
             
             # 이미지 업데이트를 메인 스레드에서 실행
-            if not video_stop_event.is_set():
-                img_btn.after(1, lambda img=new_image: update_video_frame(img))
-            
-            time.sleep(frame_delay)
+            img_btn.after(0, lambda img=images[index]: update_video_frame(img_btn, ctk_image, img))
             
     except Exception as e:
         print(f"Error in video playback: {e}")
     finally:
-        cap.release()
-        if current_video_button == img_btn:
+        if current_video_button == img_btn and video_stop_event.is_set():
             current_video_image = None
-            current_video_button = None
 
-def update_video_frame(new_image):
+def update_video_frame(img_btn, ctk_image, frame_image):
     global current_video_image, current_video_button
     
-    if current_video_button and not video_stop_event.is_set():
-        current_video_image = new_image
-        current_video_button.configure(image=new_image)
+    if current_video_button is not img_btn or video_stop_event.is_set():
+        return
+    if frame_image is None:
+        current_video_image = ctk_image
+        img_btn.configure(image=ctk_image)
+    else:
+        ctk_image.configure(light_image=frame_image)
 
 # 동영상 재생 시작 함수
 def start_video_playback(video_path, preview_size, container, img_btn):
@@ -821,45 +3381,248 @@ def stop_video_playback():
         current_video_image = None
         current_video_button = None
 
-def load_config():
-    config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
-    if os.path.exists(config_file):
+def _read_config_file():
+    if os.path.exists(CONFIG_FILE):
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('model_folder', '')
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
         except Exception as e:
             print(f"Error loading config: {e}")
-    return ''
+    return {}
+
+# 모델 폴더 목록 (model_folders 가 없으면 예전 설정인 model_folder 사용)
+def load_model_folders():
+    config = _read_config_file()
+    folders = config.get('model_folders') or config.get('model_folder') or []
+    if isinstance(folders, str):
+        folders = [folders]
+    return [folder for folder in folders if folder]
 
-def save_config(folder_path):
-    config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+def save_config(folders):
+    # 사용자가 추가한 설정값은 유지
+    if isinstance(folders, str):
+        folders = [folders]
+    config = _read_config_file()
+    config['model_folders'] = list(folders)
+    # 예전 버전과의 호환을 위해 첫 번째 폴더는 model_folder 에도 기록
+    config['model_folder'] = folders[0] if folders else ''
     try:
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump({'model_folder': folder_path}, f, ensure_ascii=False, indent=4)
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=4)
     except Exception as e:
         print(f"Error saving config: {e}")
 
+_settings = None
+
+def get_setting(name):
+    global _settings
+    if _settings is None:
+        _settings = dict(DEFAULT_SETTINGS)
+        _settings.update({k: v for k, v in _read_config_file().items() if k in DEFAULT_SETTINGS})
+    return _settings[name]
+
+def override_settings(values):
+    """설정값 임시 변경 (벤치마크 등, config.json 에는 저장하지 않음)"""
+    global _client
+    get_setting("hash_workers")  # 설정 파일을 먼저 읽어 둠
+    _settings.update(values)
+    # API 클라이언트와 성능 기록 파일은 만들 때의 설정을 쓰므로 다음 사용 때 새로 만듦
+    with _client_lock:
+        _client = None
+    metrics.close_log()
+
 def select_folder():
+    load_gui_modules()
     root = tk.Tk()
     root.withdraw()  # Hide the root window
     folder_path = filedialog.askdirectory(title="Select Lora Models Folder")
     root.destroy()
     return folder_path
 
-if __name__ == "__main__":
-    # Load saved folder path or prompt user to select one
-    folder_path = load_config()
+# 명령줄 모드 (GUI/동영상 모듈을 불러오지 않으므로 모델 서버의 cron 등에서 사용)
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Civitai 모델 정보 관리 (명령 없이 실행하면 GUI 를 띄움)")
+    parser.add_argument("--db", help="사용할 DB 파일 (기본: 프로그램 폴더의 model_info.db)")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    for name, help_text in (
+        ("scan", "JSON 파일 내용을 DB 에 반영 (네트워크 사용 안 함)"),
+        ("fetch", "정보가 없는 모델을 해시로 조회해서 JSON/미리보기 저장"),
+        ("sync", "scan + fetch + scan (GUI 의 갱신 버튼과 같음)"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("folders", nargs="*", help="모델 폴더, 여러 개 가능 (기본: config.json 의 model_folders)")
+        if name != "scan":
+            command.add_argument("--jobs", type=int, help="해시 계산 스레드 수 (기본: hash_workers 설정)")
+        command.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력 (로그는 stderr)")
+
+    command = commands.add_parser("shrink-previews", help="이미 받은 큰 미리보기 이미지를 줄여서 다시 저장")
+    command.add_argument("folders", nargs="*", help="모델 폴더, 여러 개 가능 (기본: config.json 의 model_folders)")
+    command.add_argument("--max-dimension", type=int, help="최대 가로/세로(px) (기본: preview_max_dimension 설정)")
+    command.add_argument("--jobs", type=int, help="프로세스 수 (기본: thumbnail_workers 설정)")
+    command.add_argument("--dry-run", action="store_true", help="줄이지 않고 대상만 셈")
+    command.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력 (로그는 stderr)")
+
+    command = commands.add_parser("dupes", help="내용이 같은 모델 파일 찾기 (텐서 데이터 해시 AutoV3 기준)")
+    command.add_argument("folders", nargs="*", help="모델 폴더, 여러 개 가능 (기본: config.json 의 model_folders)")
+    command.add_argument("--jobs", type=int, help="해시 계산 스레드 수 (기본: hash_workers 설정)")
+    command.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력 (로그는 stderr)")
+
+    command = commands.add_parser("find-hash", help="해시(SHA256, AutoV2, AutoV3)로 DB 에 있는 모델 파일 찾기")
+    command.add_argument("hash", help="해시 값 (대소문자 구분 안 함)")
+    command.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+
+    command = commands.add_parser("search", help="DB 에서 모델 검색 (base:, type:, tag: 구문 사용 가능)")
+    command.add_argument("query", nargs="*", help="검색어")
+    command.add_argument("--sort", choices=["relevance"] + list(SEARCH_SORTS), default="relevance")
+    command.add_argument("--limit", type=int, help="최대 결과 수")
+    command.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    return parser
+
+# 해시/조회/다운로드 결과 집계
+def _cli_fetch(folders, jobs, files=None):
+    stats = {"pending": 0, "hashed": 0, "found": 0, "not_found": 0, "failed": 0,
+             "downloaded": 0, "downloaded_bytes": 0}
+    lock = threading.Lock()
+
+    def progress(stage, **info):
+        with lock:
+            if stage == "start":
+                stats["pending"] = info["total"]
+            elif stage == "hashed":
+                stats["hashed"] += 1
+            elif stage == "saved":
+                if info["found"]:
+                    stats["found"] += 1
+                elif info["status"] == "not_found":
+                    stats["not_found"] += 1
+                else:
+                    stats["failed"] += 1  # 요청 실패 (모델이 없다는 뜻은 아님)
+                if info["size"]:
+                    stats["downloaded"] += 1
+                    stats["downloaded_bytes"] += info["size"]
+
+    process_safetensors_files(folders, workers=jobs, files=files, progress=progress)
+    return stats
+
+# 모든 모델 파일의 해시를 계산(캐시 우선)한 뒤 같은 내용끼리 묶음
+def _cli_dupes(folders, jobs, files):
+    for _ in hash_files(files, jobs):
+        pass
+    roots = [str(root) for root in model_roots(folders)]
+    groups = []
+    for paths in find_duplicate_files():
+        # 해시 캐시에는 다른 폴더나 이미 지워진 파일도 남아 있을 수 있음
+        paths = sorted(path for path in paths if _is_under(path, roots) and os.path.exists(path))
+        if len(paths) > 1:
+            groups.append(paths)
+    return sorted(groups)
+
+def _cli_search(args):
+    keyword, filters = parse_search_query(" ".join(args.query))
+    with metrics.span("search", query=keyword) as span:
+        rows = search_models(keyword, sort=args.sort, **filters)
+        span["results"] = len(rows)
+    if args.limit:
+        rows = rows[:args.limit]
+    return [{"id": row[0], "modelId": row[1], "path": row[2], "modelname": row[3]} for row in rows]
+
+def run_cli(args):
+    start = time.perf_counter()
+    # --json 이면 결과만 stdout 으로 내보내고 진행 로그는 stderr 로 보냄
+    log = sys.stderr if args.json else sys.stdout
+    with redirect_stdout(log):
+        if args.command == "search":
+            result = _cli_search(args)
+        elif args.command == "find-hash":
+            result = find_files_by_hash(args.hash)
+        else:
+            folders = args.folders or load_model_folders()
+            # 연결이 끊긴 폴더가 일부 있어도 나머지는 처리함 (그 폴더의 모델은 DB 에서 지우지 않음)
+            if not any(os.path.isdir(folder) for folder in folders):
+                print(f"모델 폴더를 찾을 수 없습니다: {', '.join(folders) or '(config.json 에 model_folders 없음)'}",
+                      file=sys.stderr)
+                return 2
+            result = {"folders": [str(root) for root in model_roots(folders)]}
+            # 폴더는 한 번만 훑고 모든 단계가 같은 파일 목록을 씀
+            files = discover_model_files(folders)
+            if args.command in ("scan", "sync"):
+                result["scan"] = scan_and_update_db(folders, discovered=files)
+            if args.command in ("fetch", "sync"):
+                result["fetch"] = _cli_fetch(folders, args.jobs, files)
+            if args.command == "sync":
+                # 새로 받은 JSON 반영
+                rescan = scan_and_update_db(folders, discovered=files)
+                result["scan"] = {"models": rescan["models"],
+                                  "updated": result["scan"]["updated"] + rescan["updated"],
+                                  "removed": result["scan"]["removed"] + rescan["removed"]}
+            if args.command == "dupes":
+                result["dupes"] = _cli_dupes(folders, args.jobs, files)
+            if args.command == "shrink-previews":
+                result["shrink"] = shrink_existing_previews(folders, args.max_dimension, args.jobs, files,
+                                                            args.dry_run)
+            result["elapsed"] = round(time.perf_counter() - start, 3)
+        metrics.observe(f"cli_{args.command.replace('-', '_')}", time.perf_counter() - start)
+        metrics.write_prometheus()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.command == "search":
+        for row in result:
+            print(f"{row['modelname']}\t{row['path']}\thttps://civitai.com/models/{row['modelId']}/")
+        print(f"{len(result)}개", file=sys.stderr)
+    elif args.command == "find-hash":
+        for path in result:
+            print(path)
+        print(f"{len(result)}개", file=sys.stderr)
+    elif args.command == "dupes":
+        for paths in result["dupes"]:
+            print("\n".join(paths) + "\n")
+        print(f"중복 {len(result['dupes'])}묶음 ({result['elapsed']:.2f}초)")
+    else:
+        summary = []
+        if "scan" in result:
+            scan = result["scan"]
+            summary.append(f"DB: 모델 {scan['models']}개 ({scan['updated']}개 갱신, {scan['removed']}개 삭제)")
+        if "fetch" in result:
+            fetch = result["fetch"]
+            summary.append(f"조회: {fetch['pending']}개 중 {fetch['found']}개 찾음, "
+                           + (f"{fetch['failed']}개 요청 실패, " if fetch["failed"] else "")
+                           + f"미리보기 {fetch['downloaded']}개 {fetch['downloaded_bytes'] / (1024 * 1024):.1f} MB")
+        if "shrink" in result:
+            summary.append(f"미리보기 {format_shrink_stats(result['shrink'], args.dry_run)}")
+        print(" / ".join(summary) + f" ({result['elapsed']:.2f}초)")
+    return 0
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.db:
+        set_db_file(args.db)
+    if args.command:
+        return run_cli(args)
+
+    # Load saved folder paths or prompt user to select one
+    folders = load_model_folders()
+    
+    # 폴더가 모두 연결 안 된 경우(NAS 가 아직 마운트 안 됨 등)에는 설정을 바꾸지 않고 DB 내용으로 띄움
+    # (감시/갱신은 연결된 폴더만 읽고, 연결이 끊긴 폴더의 모델은 DB 에서 지우지 않음)
+    if folders and not any(os.path.isdir(folder) for folder in folders):
+        print(f"모델 폴더에 연결할 수 없습니다: {', '.join(folders)} (연결되면 폴더 감시나 갱신 버튼으로 읽음)")
     
-    if not folder_path or not os.path.isdir(folder_path):
+    if not folders:
         print("Please select the folder containing your Lora models")
         folder_path = select_folder()
         if not folder_path:
             print("No folder selected. Exiting...")
-            exit()
-        save_config(folder_path)
+            return 1
+        folders = [folder_path]
+        save_config(folders)
     
-    print(f"Using folder: {folder_path}")
-    scan_and_update_db(folder_path)
-    process_safetensors_files(folder_path)
-    launch_gui(folder_path)
+    print(f"Using folders: {', '.join(folders)}")
+    # DB 에 있는 내용으로 창을 먼저 띄우고, 스캔/조회/썸네일은 백그라운드에서 실행
+    launch_gui(folders, sync_on_start=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import loraCivitaiHelper as helper
+
+
+def make_library(root):
+    (root / "sub").mkdir()
+    model = root / "sub" / "model.safetensors"
+    model.write_bytes(b"model")
+    model.with_suffix(".civitai.info.json").write_text("{}", encoding="utf-8")
+    (root / "other.safetensors").write_bytes(b"other")
+    return model
+
+
+def settle(watcher):
+    # 처음 두 번은 기존 파일을 모두 새 파일로 보고함
+    watcher.poll()
+    return watcher.poll()
+
+
+def test_reports_existing_models_once(tmp_path):
+    model = make_library(tmp_path)
+    watcher = helper.FolderWatcher(tmp_path, on_change=None)
+    assert settle(watcher) == {str(model), str(tmp_path / "other.safetensors")}
+    assert watcher.poll() == set()
+
+
+# 파일 내용만 바뀌면 폴더 수정 시각은 그대로이므로 목록 캐시가 있어도 파일 정보는 다시 읽어야 함
+def test_detects_in_place_edits(tmp_path):
+    model = make_library(tmp_path)
+    watcher = helper.FolderWatcher(tmp_path, on_change=None)
+    settle(watcher)
+    dir_mtime = os.stat(model.parent).st_mtime_ns
+
+    with open(model.with_suffix(".civitai.info.json"), "a", encoding="utf-8") as f:
+        f.write(" ")
+    assert os.stat(model.parent).st_mtime_ns == dir_mtime
+    assert watcher.poll() == set()  # 쓰는 중일 수 있으므로 한 번 더 같게 보일 때 알림
+    assert watcher.poll() == {str(model)}
+    assert watcher.poll() == set()
+
+    with open(model, "ab") as f:
+        f.write(b"more")
+    watcher.poll()
+    assert watcher.poll() == {str(model)}
+
+
+def test_detects_same_size_overwrite(tmp_path):
+    model = make_library(tmp_path)
+    watcher = helper.FolderWatcher(tmp_path, on_change=None)
+    settle(watcher)
+
+    st = os.stat(model)
+    model.write_bytes(b"MODEL")
+    os.utime(model, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    watcher.poll()
+    assert watcher.poll() == {str(model)}
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import loraCivitaiHelper as helper
+
+MODELS = [
+    ("Anime Girl", "anime_girl.safetensors", ["anigirl"], ["style", "Anime"], "SDXL 1.0", "LORA"),
+    ("Photo-Real", "photo-real_v2.safetensors", [], ["photo"], "SD 1.5", "Checkpoint"),
+    ("Café Interior", "interior_v1.safetensors", ["caféstyle"], ["Architecture"], "SD 1.5", "LORA"),
+    ("Naïve Sketch", "naive.safetensors", ["sketchy"], ["style", "Sketch"], "Pony", "LoCon"),
+    ("한국 풍경", "korea.safetensors", ["풍경화"], ["풍경"], "SDXL 1.0", "LORA"),
+    ("Cyberpunk City", "cyber_city.safetensors", ["neon_lights"], ["city", "sci-fi"], "Flux.1 D", "LORA"),
+]
+
+QUERIES = [
+    "", "anime", "ani", "ANIME girl", "girl anime", "nime", "photo-real", "-real", "photo -real",
+    "-", "'", "anime -", "cafe", "café", "CAFÉ interior", "naive", "naïve", "caféstyle", "cafestyle",
+    "한국", "풍경", "풍", "neon", "neon_lights", "lights", "sci", "fi", "zzzz",
+    "tag:style", "tag:Style", "tag:ANIME", "tag:architecture cafe", "tag:풍경",
+    "base:sdxl_1.0", "base:SD_1.5 photo", "type:lora", "type:LoCon sketch", "type:lora base:pony",
+]
+
+
+@pytest.fixture
+def library(tmp_path):
+    helper.set_db_file(tmp_path / "model_info.db")
+    for i, (name, file_name, trained, tags, base_model, model_type) in enumerate(MODELS):
+        helper.insert_model_data(i + 1, str(tmp_path / file_name), name, trained, tags=tags,
+                                 baseModel=base_model, modelType=model_type)
+    if not helper.fts_enabled:
+        pytest.skip("SQLite 에 FTS5 가 없음")
+    yield
+    helper.set_db_file(helper.DEFAULT_DB_FILE)
+
+
+# GUI 의 메모리 검색과 CLI 의 SQL 검색은 같은 모델을 찾아야 함
+@pytest.mark.parametrize("query", QUERIES)
+def test_index_matches_sql(library, query):
+    keyword, filters = helper.parse_search_query(query)
+    expected = sorted(row[2] for row in helper.search_models(keyword, **filters))
+    assert sorted(row[2] for row in helper.ModelSearchIndex().search(keyword, **filters)) == expected
+
+
+def test_diacritics_are_ignored(library):
+    names = [row[3] for row in helper.ModelSearchIndex().search("cafe")]
+    assert names == ["Café Interior"]
+
+
+# 바뀐 모델만 다시 읽은 색인은 전체를 새로 읽은 색인과 같은 결과를 내야 함
+def test_update_matches_reload(library, tmp_path):
+    index = helper.ModelSearchIndex()
+    assert index.search("anime")  # 색인을 읽고 결과를 캐시에 남김
+    helper.insert_model_data(100, str(tmp_path / "anime_boy.safetensors"), "Anime Boy", [], tags=["Anime"])
+    helper.insert_model_data(3, str(tmp_path / "interior_v1.safetensors"), "Zen Interior", [], tags=["zen"])
+    with helper.db_write() as conn:
+        conn.execute("DELETE FROM models WHERE path = ?", (str(tmp_path / "naive.safetensors"),))
+    index.update([tmp_path / "anime_boy.safetensors", tmp_path / "interior_v1.safetensors",
+                  tmp_path / "naive.safetensors"])
+    for query in ("", "anime", "cafe", "zen", "tag:anime", "naive", "tag:style"):
+        keyword, filters = helper.parse_search_query(query)
+        assert index.search(keyword, **filters) == helper.ModelSearchIndex().search(keyword, **filters)